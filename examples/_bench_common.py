@@ -0,0 +1,33 @@
+from pydatabase.sqlite_interface import SqliteInterface
+import sqlite3
+
+DESCRIPTION = """
+
+Shared fixtures of the sqlite benchmarks: the items table (as in data/shop.db, with NOT NULL fields) and generated rows
+for it.
+
+"""
+
+SCHEMA = ("CREATE TABLE items (name TEXT PRIMARY KEY NOT NULL, category TEXT NOT NULL, "
+          "price REAL NOT NULL, stocked INTEGER NOT NULL);")
+FIELD_MAP = {"name": "name", "category": "category", "price": "price", "stocked": "stocked"}
+
+
+def make_entries(num_rows, num_categories=None, name="item{}"):
+    # rows item0, item1, ... (or name.format(i)), all "Sporting Goods" unless spread over num_categories categories
+    for i in range(num_rows):
+        category = f"category{i % num_categories}" if num_categories else "Sporting Goods"
+        yield {"name": name.format(i), "category": category, "price": i * 0.01, "stocked": i % 2}
+
+
+def make_db(path, entries=None):
+    # create the items table in a new database file, and bulk load entries into it
+    connection = sqlite3.connect(path)
+    connection.execute(SCHEMA)
+    connection.commit()
+    connection.close()
+
+    if entries is not None:
+        db = SqliteInterface(path)
+        db.insert_rows(entries=entries, table='items', field_map=FIELD_MAP)
+        db.close()
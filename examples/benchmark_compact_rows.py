@@ -0,0 +1,46 @@
+from pydatabase.sqlite_interface import SqliteInterface
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from _bench_common import make_db, make_entries
+
+DESCRIPTION = """
+
+Compares query(output_json=True) returning a dictionary per row against compact Row objects (compact_rows=True), on a
+500k row table: time to build the result, and memory held by it (measured with tracemalloc, in a separate pass).
+
+"""
+
+NUM_ROWS = 500000
+
+
+def measure(db, compact_rows):
+    gc.collect()
+    start = time.perf_counter()
+    data = db.query(table='items', output_json=True, compact_rows=compact_rows)
+    elapsed = time.perf_counter() - start
+    del data
+
+    gc.collect()
+    tracemalloc.start()
+    data = db.query(table='items', output_json=True, compact_rows=compact_rows)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return elapsed, size
+
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rows.db')
+        make_db(path, make_entries(NUM_ROWS, num_categories=50))
+        db = SqliteInterface(path)
+
+        for name, compact_rows in (('dict per row', False), ('compact Row', True)):
+            elapsed, size = measure(db, compact_rows)
+            print(f"{name:<13}: {elapsed:.2f}s  {size / 2 ** 20:7.1f} MiB  ({size / NUM_ROWS:.0f} bytes/row)")
+
+        db.close()
@@ -0,0 +1,40 @@
+from pydatabase.sqlite_interface import SqliteInterface
+import os
+import tempfile
+from _bench_common import make_db, make_entries
+
+DESCRIPTION = """
+
+Measures rows per second for streaming a 1M row table out to csv / ndjson, and bulk loading those files back in.
+
+"""
+
+NUM_ROWS = 1000000
+
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'source.db')
+        make_db(path, make_entries(NUM_ROWS))
+        db = SqliteInterface(path)
+
+        for fmt in ('csv', 'ndjson'):
+            file_path = os.path.join(tmp, f'items.{fmt}')
+            if fmt == 'csv':
+                stats = db.export_fields_to_csv(file_path, table='items')
+            else:
+                stats = db.export_fields_to_ndjson(file_path, table='items')
+            print(f"export {fmt:<6}: {stats['rows']} rows in {stats['elapsed']:.2f}s ({stats['rows_per_sec']:,.0f} rows/s)")
+
+            target_path = os.path.join(tmp, f'target_{fmt}.db')
+            make_db(target_path)
+            target = SqliteInterface(target_path)
+            if fmt == 'csv':
+                stats = target.import_csv(file_path, table='items')
+            else:
+                stats = target.import_ndjson(file_path, table='items')
+            target.close()
+            print(f"import {fmt:<6}: {stats['rows']} rows in {stats['elapsed']:.2f}s ({stats['rows_per_sec']:,.0f} rows/s)")
+
+        db.close()
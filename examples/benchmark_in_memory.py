@@ -0,0 +1,53 @@
+from pydatabase.sqlite_interface import SqliteInterface
+import os
+import tempfile
+import time
+from _bench_common import make_db, make_entries
+
+DESCRIPTION = """
+
+Compares query latency of an in-memory working copy (in_memory=True) against the file-backed interface, for point
+lookups by primary key and for a full scan, on a 500k row table. Also reports the cost of loading and flushing the copy.
+
+"""
+
+NUM_ROWS = 500000
+NUM_LOOKUPS = 20000
+NUM_SCANS = 20
+
+
+def run(db):
+    start = time.perf_counter()
+    for i in range(NUM_LOOKUPS):
+        db.query(table='items', display_fields=('price',), query='name=?', params=(f"item{(i * 7919) % NUM_ROWS}",))
+    lookup = (time.perf_counter() - start) / NUM_LOOKUPS
+
+    start = time.perf_counter()
+    for i in range(NUM_SCANS):
+        db.query(table='items', display_fields=('name',), query='category=? and price<?', params=(f"category{i}", 100))
+    scan = (time.perf_counter() - start) / NUM_SCANS
+    return lookup, scan
+
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'memory.db')
+        make_db(path, make_entries(NUM_ROWS, num_categories=50))
+
+        db = SqliteInterface(path)
+        lookup, scan = run(db)
+        db.close()
+        print(f"file-backed: {lookup * 1e6:8.1f} us/lookup  {scan * 1e3:8.2f} ms/scan")
+
+        start = time.perf_counter()
+        db = SqliteInterface(path, in_memory=True)
+        load = time.perf_counter() - start
+        lookup, scan = run(db)
+        print(f"in-memory  : {lookup * 1e6:8.1f} us/lookup  {scan * 1e3:8.2f} ms/scan  (load {load:.2f}s)")
+
+        db.update_fields(table='items', update={"price": 0.0}, query='name=?', params=("item0",))
+        start = time.perf_counter()
+        db.flush()
+        print(f"flush      : {time.perf_counter() - start:.2f}s")
+        db.close()
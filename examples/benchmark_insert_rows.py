@@ -0,0 +1,35 @@
+from pydatabase.sqlite_interface import SqliteInterface
+import os
+import tempfile
+import time
+from _bench_common import FIELD_MAP, make_db, make_entries
+
+DESCRIPTION = """
+
+Compares row-by-row insert_row against bulk insert_rows on a scratch copy of the items table.
+
+"""
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        # row-by-row (one commit per row), kept small as it is slow
+        path = os.path.join(tmp, 'single.db')
+        make_db(path)
+        db = SqliteInterface(path)
+        num_rows = 2000
+        start = time.perf_counter()
+        for entry in make_entries(num_rows):
+            db.insert_row(entry=entry, table='items', field_map=FIELD_MAP)
+        elapsed = time.perf_counter() - start
+        db.close()
+        print(f"insert_row:  {num_rows} rows in {elapsed:.2f}s ({num_rows / elapsed:,.0f} rows/s)")
+
+        # bulk, streamed from a generator
+        path = os.path.join(tmp, 'bulk.db')
+        make_db(path)
+        db = SqliteInterface(path)
+        stats = db.insert_rows(entries=make_entries(1000000), table='items', field_map=FIELD_MAP, batch_size=50000)
+        db.close()
+        print(f"insert_rows: {stats['rows']} rows in {stats['elapsed']:.2f}s ({stats['rows_per_sec']:,.0f} rows/s)")
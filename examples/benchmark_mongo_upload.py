@@ -0,0 +1,53 @@
+from pydatabase.mongo_interface import MongoInterface
+import time
+
+import pymongo
+
+DESCRIPTION = """
+
+Compares uploading documents one insert_one at a time (upload_document in a loop) against the batched insert_many path
+of upload_collection, at several batch sizes.
+
+Uses a local mongod if one is running, otherwise an in-process mongomock client (pip install mongomock), which has no
+network round trips, so it understates the gain.
+
+"""
+
+NUM_DOCS = 50000
+
+
+def make_docs():
+    return ({"name": f"item{i}", "category": f"category{i % 50}", "price": i * 0.01, "stocked": i % 2}
+            for i in range(NUM_DOCS))
+
+
+def connect():
+    db = MongoInterface('benchmark_upload', connection_str='mongodb://localhost:27017')
+    try:
+        db.client.admin.command('ping')
+        return db, 'mongod'
+    except pymongo.errors.ServerSelectionTimeoutError:
+        import mongomock
+        db.client = mongomock.MongoClient()
+        db.db = db.client['benchmark_upload']
+        return db, 'mongomock'
+
+
+if __name__ == "__main__":
+
+    db, server = connect()
+    print(f"server: {server}, {NUM_DOCS:,} documents")
+
+    db.delete_collection(collection='items')
+    start = time.perf_counter()
+    for doc in make_docs():
+        db.upload_document(doc, collection='items')
+    elapsed = time.perf_counter() - start
+    print(f"upload_document loop      : {elapsed:6.2f}s ({NUM_DOCS / elapsed:,.0f} docs/s)")
+
+    for batch_size in (100, 1000, 10000):
+        db.delete_collection(collection='items')
+        report = db.upload_collection(make_docs(), collection='items', batch_size=batch_size)
+        print(f"upload_collection x {batch_size:<6}: {report['elapsed']:6.2f}s ({report['docs_per_sec']:,.0f} docs/s)")
+
+    db.delete_collection(collection='items')
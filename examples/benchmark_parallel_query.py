@@ -0,0 +1,37 @@
+from pydatabase.sqlite_interface import SqliteInterface
+import os
+import tempfile
+import time
+from _bench_common import make_db, make_entries
+
+DESCRIPTION = """
+
+Measures full-table reads of a 2M row table with parallel_query, scaling from 1 to N thread and process workers,
+against a plain query.
+
+"""
+
+NUM_ROWS = 2000000
+
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'scan.db')
+        make_db(path, make_entries(NUM_ROWS, num_categories=50))
+        db = SqliteInterface(path)
+
+        start = time.perf_counter()
+        db.query(table='items')
+        print(f"query                : {time.perf_counter() - start:.2f}s")
+
+        max_workers = os.cpu_count() or 1
+        workers = sorted({1, 2, 4, max_workers})
+        for executor in ('thread', 'process'):
+            for num_workers in workers:
+                start = time.perf_counter()
+                rows = db.parallel_query(table='items', workers=num_workers, executor=executor)
+                elapsed = time.perf_counter() - start
+                print(f"{executor:<7} x {num_workers:<2} workers: {elapsed:.2f}s ({len(rows) / elapsed:,.0f} rows/s)")
+
+        db.close()
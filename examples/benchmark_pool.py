@@ -0,0 +1,59 @@
+from pydatabase.sqlite_interface import SqliteInterface
+import os
+import tempfile
+import threading
+import time
+from _bench_common import make_db, make_entries
+
+DESCRIPTION = """
+
+Measures read throughput of a pooled (pool_size) SqliteInterface shared between threads, as the number of reader
+threads grows, with one writer thread updating rows concurrently.
+
+"""
+
+NUM_ROWS = 200000
+DURATION = 3.0
+
+
+def run(db, num_threads):
+    stop = threading.Event()
+    counts = [0] * num_threads
+    writes = [0]
+
+    def reader(idx):
+        while not stop.is_set():
+            # a full scan returning a handful of rows, so the time is spent inside sqlite (which releases the GIL)
+            db.query(table='items', display_fields=('name',), query='category=? and price<?',
+                     params=(f"category{idx % 50}", 100))
+            counts[idx] += 1
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            db.update_fields(table='items', update={"price": i * 0.01}, query='name=?', params=(f"item{i}",))
+            i = (i + 1) % NUM_ROWS
+            writes[0] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(num_threads)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / DURATION, writes[0] / DURATION
+
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'pool.db')
+        make_db(path, make_entries(NUM_ROWS, num_categories=50))
+
+        for num_threads in (1, 2, 4, 8):
+            db = SqliteInterface(path, pool_size=num_threads)
+            reads_per_sec, writes_per_sec = run(db, num_threads)
+            db.close()
+            print(f"{num_threads} reader threads: {reads_per_sec:,.0f} reads/s ({writes_per_sec:,.0f} writes/s)")
@@ -0,0 +1,58 @@
+from pydatabase.sqlite_interface import SqliteInterface, PROFILES
+import os
+import tempfile
+import time
+from _bench_common import FIELD_MAP, SCHEMA, make_entries
+
+DESCRIPTION = """
+
+Runs the same insert and query workloads on a fresh database under each performance profile (and sqlite's defaults):
+a bulk insert_rows load, single-row insert_row commits, primary key lookups, and filtered full scans.
+
+"""
+
+NUM_ROWS = 500000
+NUM_SINGLE_INSERTS = 2000
+NUM_LOOKUPS = 20000
+NUM_SCANS = 20
+
+
+def run(path, profile):
+    # the profile is applied before the table is created, so that its page_size takes effect
+    db = SqliteInterface(path, profile=profile)
+    db.sql_command(SCHEMA, modify_db=True)
+
+    entries = make_entries(NUM_ROWS, num_categories=50)
+    bulk = db.insert_rows(entries=entries, table='items', field_map=FIELD_MAP)['rows_per_sec']
+
+    start = time.perf_counter()
+    for i in range(NUM_SINGLE_INSERTS):
+        db.insert_row(entry={"name": f"extra{i}", "category": "extra", "price": 1.0, "stocked": 1}, table='items',
+                      field_map=FIELD_MAP)
+    single = NUM_SINGLE_INSERTS / (time.perf_counter() - start)
+    db.close()
+
+    # reopen, so reads start from a cold page cache
+    db = SqliteInterface(path, profile=profile)
+    start = time.perf_counter()
+    for i in range(NUM_LOOKUPS):
+        db.query(table='items', display_fields=('price',), query='name=?', params=(f"item{(i * 7919) % NUM_ROWS}",))
+    lookup = (time.perf_counter() - start) / NUM_LOOKUPS
+
+    start = time.perf_counter()
+    for i in range(NUM_SCANS):
+        db.query(table='items', display_fields=('name',), query='category=? and price<?', params=(f"category{i}", 100))
+    scan = (time.perf_counter() - start) / NUM_SCANS
+    db.close()
+
+    return bulk, single, lookup, scan
+
+
+if __name__ == "__main__":
+
+    print(f"{'profile':<12}{'bulk rows/s':>14}{'insert_row/s':>14}{'us/lookup':>12}{'ms/scan':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in [None] + list(PROFILES):
+            path = os.path.join(tmp, f'{profile}.db')
+            bulk, single, lookup, scan = run(path, profile)
+            print(f"{str(profile):<12}{bulk:>14,.0f}{single:>14,.0f}{lookup * 1e6:>12.1f}{scan * 1e3:>10.2f}")
@@ -0,0 +1,52 @@
+from pydatabase.sqlite_interface import SqliteInterface
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from _bench_common import make_db, make_entries
+
+DESCRIPTION = """
+
+Compares reading two numeric columns of a 1M row table as tuples (and then converting to numpy arrays) against the
+columnar output modes of query.
+
+"""
+
+NUM_ROWS = 1000000
+
+
+def tuples_to_numpy(db):
+    rows = db.query(table='items', display_fields=('price', 'stocked'))
+    return {'price': np.array([r[0] for r in rows], dtype=np.float64),
+            'stocked': np.array([r[1] for r in rows], dtype=np.int64)}
+
+
+def measure(name, func):
+    # time and memory are measured in separate runs, as tracemalloc slows down allocation-heavy code
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{name:<22}: {elapsed:.2f}s, peak {peak / 2**20:,.0f} MB")
+
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'big.db')
+        make_db(path, make_entries(NUM_ROWS))
+        db = SqliteInterface(path)
+        db.query(table='items', display_fields=('price', 'stocked'))  # warm the page cache
+
+        measure("tuples", lambda: db.query(table='items', display_fields=('price', 'stocked')))
+        measure("tuples -> numpy", lambda: tuples_to_numpy(db))
+        measure("output='columns'", lambda: db.query(table='items', display_fields=('price', 'stocked'), output='columns'))
+        measure("output='numpy'", lambda: db.query(table='items', display_fields=('price', 'stocked'), output='numpy'))
+        measure("output='structured'",
+                lambda: db.query(table='items', display_fields=('price', 'stocked'), output='structured'))
+        db.close()
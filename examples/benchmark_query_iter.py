@@ -0,0 +1,50 @@
+from pydatabase.sqlite_interface import SqliteInterface
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from _bench_common import make_db, make_entries
+
+DESCRIPTION = """
+
+Compares the peak memory (RSS) of reading a 1M row table with query (fetchall) against streaming it with query_iter.
+Each mode runs in a fresh process so peak RSS is measured independently.
+
+"""
+
+NUM_ROWS = 1000000
+
+
+def read(path, mode, output_json, queue):
+    db = SqliteInterface(path)
+    start = time.perf_counter()
+    total = 0.0
+    if mode == 'query':
+        data = db.query(table='items', output_json=output_json)
+        rows = data.values() if output_json else data
+        for row in rows:
+            total += row['price'] if output_json else row[2]
+    else:
+        for row in db.query_iter(table='items', output_json=output_json, batch_size=1000):
+            total += row[1]['price'] if output_json else row[2]
+    elapsed = time.perf_counter() - start
+    db.close()
+    # ru_maxrss is in kilobytes on linux
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'big.db')
+        make_db(path, make_entries(NUM_ROWS))
+
+        for output_json in (False, True):
+            for mode in ('query', 'query_iter'):
+                queue = multiprocessing.Queue()
+                process = multiprocessing.Process(target=read, args=(path, mode, output_json, queue))
+                process.start()
+                elapsed, peak_mb = queue.get()
+                process.join()
+                print(f"{mode:<10} output_json={output_json!s:<5}: {elapsed:.2f}s, peak RSS {peak_mb:,.0f} MB")
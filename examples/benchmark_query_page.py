@@ -0,0 +1,50 @@
+from pydatabase.sqlite_interface import SqliteInterface
+import os
+import tempfile
+import time
+from _bench_common import make_db, make_entries
+
+DESCRIPTION = """
+
+Compares the cost of page 1 and page 10,000 (100 rows per page) of a 1M row table with keyset pagination (query_page)
+against appending LIMIT/OFFSET to the query.
+
+"""
+
+NUM_ROWS = 1000000
+PAGE_SIZE = 100
+DEEP_PAGE = 10000
+
+
+def timed(func, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'pages.db')
+        make_db(path, make_entries(NUM_ROWS, name="item{:07d}"))
+        db = SqliteInterface(path)
+
+        # walk to the token for the deep page
+        token = None
+        for page in range(1, DEEP_PAGE):
+            rows, token = db.query_page(table='items', display_fields=('name', 'price'), page_size=PAGE_SIZE,
+                                        after=token)
+
+        for page, after in ((1, None), (DEEP_PAGE, token)):
+            ms, _ = timed(lambda: db.query_page(table='items', display_fields=('name', 'price'), page_size=PAGE_SIZE,
+                                                after=after))
+            print(f"keyset page {page:>5}: {ms:.3f} ms")
+
+        for page in (1, DEEP_PAGE):
+            offset = (page - 1) * PAGE_SIZE
+            ms, _ = timed(lambda: db.query(table='items', display_fields=('name', 'price'),
+                                           query=f"1 order by name limit {PAGE_SIZE} offset {offset}"))
+            print(f"offset page {page:>5}: {ms:.3f} ms")
+
+        db.close()
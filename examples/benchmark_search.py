@@ -0,0 +1,51 @@
+from pydatabase.sqlite_interface import SqliteInterface
+import os
+import tempfile
+import time
+from _bench_common import make_db
+
+DESCRIPTION = """
+
+Compares the latency of finding items by a substring of their name, on a 500k row table, with a trigram full-text
+search index (search) against a LIKE '%...%' scan (query). A trigram index matches substrings as LIKE does, so both
+return the same rows (search in rank order, query in table order). For a substring that matches a large share of the
+rows, search is slower than the scan, as every match is looked up and ranked.
+
+"""
+
+NUM_ROWS = 500000
+NUM_SEARCHES = 20
+WORDS = ['ball', 'bat', 'glove', 'racket', 'net', 'helmet', 'shoe', 'bag', 'bottle', 'towel']
+COLOURS = ['red', 'blue', 'green', 'black', 'white', 'yellow', 'purple', 'orange']
+
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'search.db')
+        make_db(path, ({"name": f"{COLOURS[i % len(COLOURS)]} {WORDS[(i // 7) % len(WORDS)]} model{i}",
+                        "category": "Sporting Goods", "price": i * 0.01, "stocked": i % 2} for i in range(NUM_ROWS)))
+        db = SqliteInterface(path)
+
+        start = time.perf_counter()
+        db.create_search_index(table='items', fields=('name',), tokenize='trigram')
+        print(f"build index : {time.perf_counter() - start:.2f}s")
+
+        rare = [f"model{i * 997}" for i in range(NUM_SEARCHES)]
+        common = [WORDS[i % len(WORDS)] for i in range(NUM_SEARCHES)]
+        for label, texts in (("rare substring  ", rare), ("common substring", common)):
+            start = time.perf_counter()
+            like_rows = [db.query(table='items', display_fields=('name', 'price'), query='name like ?',
+                                  params=(f"%{text}%",)) for text in texts]
+            like = (time.perf_counter() - start) / NUM_SEARCHES
+
+            start = time.perf_counter()
+            search_rows = [db.search(table='items', text=text, display_fields=('name', 'price'), limit=None)
+                           for text in texts]
+            fts = (time.perf_counter() - start) / NUM_SEARCHES
+
+            assert all(set(a) == set(b) for a, b in zip(like_rows, search_rows))
+            matches = sum(len(rows) for rows in like_rows) / NUM_SEARCHES
+            print(f"{label} ({matches:8,.0f} matches): like {like * 1e3:8.2f} ms  search {fts * 1e3:8.2f} ms")
+
+        db.close()
@@ -0,0 +1,69 @@
+from pydatabase.sharded_sqlite_interface import ShardedSqliteInterface
+from pydatabase.sqlite_interface import SqliteInterface
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import tempfile
+import time
+from _bench_common import FIELD_MAP, SCHEMA, make_entries
+
+DESCRIPTION = """
+
+Measures write throughput of one database file against 4 shards (ShardedSqliteInterface), with 8 client threads each
+committing rows one at a time with insert_row, and with a bulk insert_rows load, on real files with synchronous=FULL:
+under the 'durable' profile (WAL journaling, one sync per commit) and with a rollback journal (several syncs per
+commit).
+
+Shards only pay off when writers queue for the write lock while commits wait on storage, so the result depends on the
+disk: on fast local storage a commit costs little more than the python work around it, and the shards mostly add
+thread hand-offs. Pass a directory on the storage of interest (e.g. a network or cloud volume) to run there instead of
+in a temporary directory:
+    python benchmark_sharded.py /mnt/volume/scratch
+
+"""
+
+NUM_THREADS = 8
+ROWS_PER_THREAD = 500
+NUM_BULK_ROWS = 500000
+NUM_SHARDS = 4
+CONFIGURATIONS = [('durable (WAL)', 'durable'),
+                  ('rollback journal', {'journal_mode': 'delete', 'synchronous': 'full'})]
+
+
+def write_rows(db, rows_per_thread):
+    def write(t):
+        for i in range(rows_per_thread):
+            db.insert_row(entry={"name": f"row{t}_{i}", "category": "single", "price": 1.0, "stocked": 1},
+                          table='items', field_map=FIELD_MAP)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=NUM_THREADS) as executor:
+        list(executor.map(write, range(NUM_THREADS)))
+    return NUM_THREADS * rows_per_thread / (time.perf_counter() - start)
+
+
+def run(db):
+    single = write_rows(db, ROWS_PER_THREAD)
+    entries = make_entries(NUM_BULK_ROWS, num_categories=50)
+    bulk = db.insert_rows(entries=entries, table='items', field_map=FIELD_MAP)['rows_per_sec']
+    return single, bulk
+
+
+def open_databases(directory, name, profile):
+    single = SqliteInterface(os.path.join(directory, f'{name}.db'), pool_size=NUM_THREADS, profile=profile)
+    sharded = ShardedSqliteInterface([os.path.join(directory, f'{name}_shard{i}.db') for i in range(NUM_SHARDS)],
+                                     profile=profile)
+    for db in (single, sharded):
+        db.sql_command(SCHEMA, modify_db=True)
+    return single, sharded
+
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory(dir=sys.argv[1] if len(sys.argv) > 1 else None) as tmp:
+        for n, (label, profile) in enumerate(CONFIGURATIONS):
+            print(f"{label}:")
+            for name, db in zip(("1 file   ", f"{NUM_SHARDS} shards "), open_databases(tmp, f'run{n}', profile)):
+                single, bulk = run(db)
+                db.close()
+                print(f"  {name}: {single:10,.0f} insert_row/s  {bulk:10,.0f} bulk rows/s")
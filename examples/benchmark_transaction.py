@@ -0,0 +1,46 @@
+from pydatabase.sqlite_interface import SqliteInterface
+import os
+import tempfile
+import time
+from _bench_common import make_db, make_entries
+
+DESCRIPTION = """
+
+Compares a mixed workload of updates and deletes committed per call against the same workload inside a single
+db.transaction() block.
+
+"""
+
+NUM_ROWS = 5000
+
+
+def workload(db):
+    for i in range(NUM_ROWS):
+        if i % 4 == 0:
+            db.delete_rows(table='items', query='name=?', params=(f"item{i}",))
+        else:
+            db.update_fields(table='items', update={"price": i * 0.02}, query='name=?', params=(f"item{i}",))
+
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        path = os.path.join(tmp, 'per_call.db')
+        make_db(path, make_entries(NUM_ROWS))
+        db = SqliteInterface(path)
+        start = time.perf_counter()
+        workload(db)
+        per_call = time.perf_counter() - start
+        db.close()
+        print(f"per-call commits:   {NUM_ROWS} mutations in {per_call:.2f}s")
+
+        path = os.path.join(tmp, 'transaction.db')
+        make_db(path, make_entries(NUM_ROWS))
+        db = SqliteInterface(path)
+        start = time.perf_counter()
+        with db.transaction():
+            workload(db)
+        batched = time.perf_counter() - start
+        db.close()
+        print(f"single transaction: {NUM_ROWS} mutations in {batched:.2f}s ({per_call / batched:.1f}x faster)")
@@ -23,10 +23,11 @@ if __name__ == "__main__":
     # mapping between json fields and database fields (db-field : json-field)
     field_map = {"name": "name", "category": "category", "price": "price", "stocked": "stocked_integer"}
 
-    # iteratively populate database
-    for item in tqdm(data):
-        item["stocked_integer"] = int(item["stocked"])
-        db.insert_row(entry=item,table="items",field_map=field_map)
+    # populate database in bulk (one commit per batch rather than one per row). Rows are converted as insert_rows
+    # consumes them, so the progress bar follows the insert
+    entries = (dict(item,stocked_integer=int(item["stocked"])) for item in tqdm(data))
+    stats = db.insert_rows(entries=entries,table="items",field_map=field_map)
+    print(f"inserted {stats['rows']} rows in {stats['elapsed']:.3f}s")
 
 
     # close connection
@@ -0,0 +1,574 @@
+import asyncio
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from itertools import islice
+
+from pydatabase.sqlite_interface import SqliteInterface, WorkerMapping
+
+# ids of the AsyncSqliteInterface instances whose transaction the current task (or a task it spawned) is inside
+_transactions = ContextVar('sqlite_transactions',default=frozenset())
+
+
+class AsyncSqliteInterface:
+    def __init__(self,db_path,statement_cache_size=128,pool_size=None,in_memory=False,flush_interval=None,
+                 profile=None):
+        '''
+        asyncio facade over SqliteInterface. Every method of SqliteInterface is mirrored as a coroutine which runs on a
+        worker thread, so the event loop is never blocked by a fetch or a commit.
+
+        The underlying SqliteInterface is created on (and all writes run on) a single dedicated writer thread. By
+        default reads run on that thread too. If pool_size is set, the interface is opened in its thread-safe pooled
+        mode and reads run concurrently on pool_size reader threads instead (see SqliteInterface).
+
+        Example usage:
+            db = AsyncSqliteInterface('../data/shop.db')
+            queries = await db.query(table='items',display_fields=('name','price'),query='price<50')
+            async for name,price in db.query_iter(table='items',display_fields=('name','price')):
+                ...
+            await db.close()
+
+        :param db_path: (str) path to an existing sqlite3 database
+        :param statement_cache_size: (int) see SqliteInterface
+        :param pool_size: (int) if set, number of concurrent reader threads/connections
+        :param in_memory: (bool) see SqliteInterface
+        :param flush_interval: (float) see SqliteInterface
+        :param profile: (str) or (dict) see SqliteInterface
+        '''
+
+        self._writer = ThreadPoolExecutor(max_workers=1,thread_name_prefix='sqlite-writer')
+        if pool_size:
+            self._reader = ThreadPoolExecutor(max_workers=pool_size,thread_name_prefix='sqlite-reader')
+        else:
+            self._reader = self._writer
+
+        self.db = self._writer.submit(SqliteInterface,db_path,statement_cache_size=statement_cache_size,
+                                      pool_size=pool_size,in_memory=in_memory,flush_interval=flush_interval,
+                                      profile=profile).result()
+        self.db_path = db_path
+        # serialises writes with transaction blocks, so that another coroutine's write can neither land inside an open
+        # transaction (and be rolled back with it) nor commit it early
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def tables(self):
+        # blocking: see get_tables
+        return self._writer.submit(lambda: self.db.tables).result()
+
+    @property
+    def fields(self):
+        # lookups are blocking: see get_fields
+        return WorkerMapping(self.db.fields,self._writer)
+
+    @property
+    def field_info(self):
+        # lookups are blocking: see get_field_info
+        return WorkerMapping(self.db.field_info,self._writer)
+
+    @property
+    def primary_key(self):
+        # lookups are blocking: see get_primary_key
+        return WorkerMapping(self.db.primary_key,self._writer)
+
+    async def get_tables(self):
+        '''
+        Coroutine version of the tables property (which blocks the event loop while it waits for a worker thread).
+
+        Example usage:
+            tables = await db.get_tables()
+
+        :return: (list) table names
+        '''
+
+        return await self._read(lambda: self.db.tables)
+
+    async def get_fields(self,table):
+        '''
+        Coroutine version of db.fields[table].
+
+        Example usage:
+            fields = await db.get_fields('items')
+
+        :param table: (str) table name
+        :return: (list) field names
+        '''
+
+        return await self._read(self.db.fields.__getitem__,table)
+
+    async def get_field_info(self,table):
+        '''
+        Coroutine version of db.field_info[table].
+
+        Example usage:
+            info = await db.get_field_info('items')
+
+        :param table: (str) table name
+        :return: (list) field name/type pairs
+        '''
+
+        return await self._read(self.db.field_info.__getitem__,table)
+
+    async def get_primary_key(self,table):
+        '''
+        Coroutine version of db.primary_key[table].
+
+        Example usage:
+            key = await db.get_primary_key('items')
+
+        :param table: (str) table name
+        :return: (str) primary key field, or None
+        '''
+
+        return await self._read(self.db.primary_key.__getitem__,table)
+
+    async def _write(self,func,*args,**kwargs):
+
+        if id(self) in _transactions.get():
+            # part of the transaction block that already holds the lock
+            return await self._run(self._writer,func,*args,**kwargs)
+        async with self._write_lock:
+            return await self._run(self._writer,func,*args,**kwargs)
+
+    async def _read(self,func,*args,**kwargs):
+
+        if self._reader is self._writer:
+            # reads share the writer's connection, so must not see another coroutine's open transaction either
+            return await self._write(func,*args,**kwargs)
+        return await self._run(self._reader,func,*args,**kwargs)
+
+    async def _run(self,executor,func,*args,**kwargs):
+
+        return await asyncio.get_running_loop().run_in_executor(executor,partial(func,*args,**kwargs))
+
+    async def close(self):
+        '''
+        Disconnect safely from the database and stop the worker threads.
+
+        :return:
+        '''
+
+        await self._write(self.db.close)
+        self._writer.shutdown()
+        if self._reader is not self._writer:
+            self._reader.shutdown()
+
+    async def flush(self):
+        '''
+        Coroutine version of SqliteInterface.flush.
+
+        Example usage:
+            await db.flush()
+        '''
+
+        return await self._write(self.db.flush)
+
+    async def insert_row(self,entry,table,field_map):
+        '''
+        Coroutine version of SqliteInterface.insert_row.
+
+        Example usage:
+            await db.insert_row(entry={"name":ball,"cost":20.0},table="items",field_map={"name":"name","price":"cost"})
+        '''
+
+        return await self._write(self.db.insert_row,entry,table,field_map)
+
+    async def insert_rows(self,entries,table,field_map,batch_size=10000):
+        '''
+        Coroutine version of SqliteInterface.insert_rows. entries may be a (synchronous) iterable or generator; it is
+        consumed on the writer thread.
+
+        Example usage:
+            stats = await db.insert_rows(entries=data,table="items",field_map={"name":"name","price":"cost"})
+        '''
+
+        return await self._write(self.db.insert_rows,entries,table,field_map,batch_size=batch_size)
+
+    async def upsert_rows(self,entries,table,field_map,batch_size=10000,key_field=None):
+        '''
+        Coroutine version of SqliteInterface.upsert_rows.
+
+        Example usage:
+            stats = await db.upsert_rows(entries=feed,table="items",field_map={"name":"name","price":"cost"})
+        '''
+
+        return await self._write(self.db.upsert_rows,entries,table,field_map,batch_size=batch_size,key_field=key_field)
+
+    async def update_rows_by_key(self,table,updates,batch_size=10000,key_field=None):
+        '''
+        Coroutine version of SqliteInterface.update_rows_by_key.
+
+        Example usage:
+            stats = await db.update_rows_by_key(table="items",updates={"Football":{"price":45.0}})
+        '''
+
+        return await self._write(self.db.update_rows_by_key,table,updates,batch_size=batch_size,key_field=key_field)
+
+    async def query(self,table,display_fields=None,query=None,output_json=False,params=None,output=None,
+                    batch_size=10000,compact_rows=False):
+        '''
+        Coroutine version of SqliteInterface.query.
+
+        Example usage:
+            queries = await db.query(table='items',display_fields=('name','price'),query='price<?',params=(50,))
+        '''
+
+        return await self._read(self.db.query,table,display_fields,query,output_json=output_json,params=params,
+                                output=output,batch_size=batch_size,compact_rows=compact_rows)
+
+    async def query_page(self,table,display_fields=None,query=None,params=None,after=None,page_size=100,
+                         order_field=None,output_json=False):
+        '''
+        Coroutine version of SqliteInterface.query_page.
+
+        Example usage:
+            rows,token = await db.query_page(table='items',display_fields=('name','price'),page_size=50,after=token)
+        '''
+
+        return await self._read(self.db.query_page,table,display_fields,query,params=params,after=after,
+                                page_size=page_size,order_field=order_field,output_json=output_json)
+
+    async def parallel_query(self,table,display_fields=None,query=None,params=None,workers=None,partitions=None,
+                             executor='thread'):
+        '''
+        Coroutine version of SqliteInterface.parallel_query.
+
+        Example usage:
+            queries = await db.parallel_query(table='items',workers=8,executor='process')
+        '''
+
+        return await self._read(self.db.parallel_query,table,display_fields,query,params=params,workers=workers,
+                                partitions=partitions,executor=executor)
+
+    async def parallel_query_iter(self,table,display_fields=None,query=None,params=None,workers=None,partitions=None,
+                                  executor='thread',batch_size=1000):
+        '''
+        Async-iterator version of SqliteInterface.parallel_query_iter: rows are yielded partition by partition, in no
+        particular order. The partitions are read in parallel as in parallel_query, and rows are handed back to the
+        event loop batch_size at a time, so other coroutines keep running while the partitions are read.
+
+        Example usage:
+            async for row in db.parallel_query_iter(table='items',workers=8,executor='process'):
+                ...
+
+        :return: async generator of tuples
+        '''
+
+        rows = self.db.parallel_query_iter(table,display_fields,query,params=params,workers=workers,
+                                           partitions=partitions,executor=executor)
+        try:
+            while True:
+                batch = await self._read(lambda: list(islice(rows,batch_size)))
+                if not batch:
+                    break
+                for row in batch:
+                    yield row
+        finally:
+            await self._read(rows.close)
+
+    async def aggregate(self,table,metrics,group_by=None,query=None,params=None,output_json=False,output=None):
+        '''
+        Coroutine version of SqliteInterface.aggregate.
+
+        Example usage:
+            queries = await db.aggregate(table='items',group_by='category',metrics={'price':['avg','max'],'*':['count']})
+        '''
+
+        return await self._read(self.db.aggregate,table,metrics,group_by=group_by,query=query,params=params,
+                                output_json=output_json,output=output)
+
+    async def query_iter(self,table,display_fields=None,query=None,batch_size=1000,output_json=False,params=None,
+                         compact_rows=False):
+        '''
+        Async-iterator version of SqliteInterface.query_iter. Each batch of batch_size rows is fetched on a worker
+        thread, so other coroutines keep running while a large read is in progress.
+
+        Example usage:
+            async for key,row in db.query_iter(table='items',query='price<50',output_json=True):
+                ...
+
+        :return: async generator of tuples
+        '''
+
+        rows = self.db.query_iter(table,display_fields,query,batch_size=batch_size,output_json=output_json,
+                                  params=params,compact_rows=compact_rows)
+        try:
+            while True:
+                batch = await self._read(lambda: list(islice(rows,batch_size)))
+                if not batch:
+                    break
+                for row in batch:
+                    yield row
+        finally:
+            await self._read(rows.close)
+
+    async def sql_command(self,command,modify_db=False):
+        '''
+        Coroutine version of SqliteInterface.sql_command.
+
+        Example usage:
+            queries = await db.sql_command("select HEIGHT from TABLE group by HEIGHT;")
+        '''
+
+        return await self._write(self.db.sql_command,command,modify_db)
+
+    async def delete_rows(self,table,query,params=None):
+        '''
+        Coroutine version of SqliteInterface.delete_rows.
+
+        Example usage:
+            await db.delete_rows(table='items',query='category=?',params=('Sporting Goods',))
+        '''
+
+        return await self._write(self.db.delete_rows,table,query,params=params)
+
+    async def delete_table(self,table):
+        '''
+        Coroutine version of SqliteInterface.delete_table.
+
+        Example usage:
+            await db.delete_table(table='items')
+        '''
+
+        return await self._write(self.db.delete_table,table)
+
+    async def clear_table(self,table):
+        '''
+        Coroutine version of SqliteInterface.clear_table.
+
+        Example usage:
+            await db.clear_table(table="items")
+        '''
+
+        return await self._write(self.db.clear_table,table)
+
+    async def get_distinct_values(self,table,field):
+        '''
+        Coroutine version of SqliteInterface.get_distinct_values.
+
+        Example usage:
+            queries = await db.get_distinct_values(table='items', field='categories')
+        '''
+
+        return await self._read(self.db.get_distinct_values,table,field)
+
+    async def update_fields(self,table,update,query,params=None):
+        '''
+        Coroutine version of SqliteInterface.update_fields.
+
+        Example usage:
+            await db.update_fields(table="items", update={"price": 5.0}, query='name=?', params=('Basketball',))
+        '''
+
+        return await self._write(self.db.update_fields,table,update,query,params=params)
+
+    async def create_index(self,table,fields,name=None,unique=False):
+        '''
+        Coroutine version of SqliteInterface.create_index.
+
+        Example usage:
+            await db.create_index(table='items',fields=('category',))
+        '''
+
+        return await self._write(self.db.create_index,table,fields,name=name,unique=unique)
+
+    async def drop_index(self,name):
+        '''
+        Coroutine version of SqliteInterface.drop_index.
+
+        Example usage:
+            await db.drop_index(name='idx_items_category')
+        '''
+
+        return await self._write(self.db.drop_index,name)
+
+    async def list_indexes(self,table=None):
+        '''
+        Coroutine version of SqliteInterface.list_indexes.
+
+        Example usage:
+            indexes = await db.list_indexes(table='items')
+        '''
+
+        return await self._read(self.db.list_indexes,table)
+
+    async def create_search_index(self,table,fields,tokenize=None):
+        '''
+        Coroutine version of SqliteInterface.create_search_index.
+
+        Example usage:
+            await db.create_search_index(table='items',fields=('name','category'))
+        '''
+
+        return await self._write(self.db.create_search_index,table,fields,tokenize=tokenize)
+
+    async def drop_search_index(self,table):
+        '''
+        Coroutine version of SqliteInterface.drop_search_index.
+
+        Example usage:
+            await db.drop_search_index(table='items')
+        '''
+
+        return await self._write(self.db.drop_search_index,table)
+
+    async def search(self,table,text,display_fields=None,limit=10,output_json=False):
+        '''
+        Coroutine version of SqliteInterface.search.
+
+        Example usage:
+            queries = await db.search(table='items',text='ball',display_fields=('name','price'))
+        '''
+
+        return await self._read(self.db.search,table,text,display_fields,limit=limit,output_json=output_json)
+
+    def enable_result_cache(self,max_size=1024,ttl=None):
+        '''
+        See SqliteInterface.enable_result_cache.
+        '''
+
+        self.db.enable_result_cache(max_size=max_size,ttl=ttl)
+
+    def disable_result_cache(self):
+        '''
+        See SqliteInterface.disable_result_cache.
+        '''
+
+        self.db.disable_result_cache()
+
+    def result_cache_info(self):
+        '''
+        See SqliteInterface.result_cache_info.
+        '''
+
+        return self.db.result_cache_info()
+
+    def enable_query_diagnostics(self,scan_threshold=10000,warn=True):
+        '''
+        See SqliteInterface.enable_query_diagnostics.
+        '''
+
+        self.db.enable_query_diagnostics(scan_threshold=scan_threshold,warn=warn)
+
+    def disable_query_diagnostics(self):
+        '''
+        See SqliteInterface.disable_query_diagnostics.
+        '''
+
+        self.db.disable_query_diagnostics()
+
+    def query_diagnostics(self,scans_only=True):
+        '''
+        See SqliteInterface.query_diagnostics.
+        '''
+
+        return self.db.query_diagnostics(scans_only=scans_only)
+
+    async def export_fields_to_csv(self,path,table,display_fields=None,query=None,params=None,batch_size=10000):
+        '''
+        Coroutine version of SqliteInterface.export_fields_to_csv.
+
+        Example usage:
+            stats = await db.export_fields_to_csv('items.csv',table='items')
+        '''
+
+        return await self._read(self.db.export_fields_to_csv,path,table,display_fields,query,params=params,
+                                batch_size=batch_size)
+
+    async def export_fields_to_ndjson(self,path,table,display_fields=None,query=None,params=None,batch_size=10000):
+        '''
+        Coroutine version of SqliteInterface.export_fields_to_ndjson.
+
+        Example usage:
+            stats = await db.export_fields_to_ndjson('items.ndjson',table='items')
+        '''
+
+        return await self._read(self.db.export_fields_to_ndjson,path,table,display_fields,query,params=params,
+                                batch_size=batch_size)
+
+    async def import_csv(self,path,table,field_map=None,batch_size=10000):
+        '''
+        Coroutine version of SqliteInterface.import_csv.
+
+        Example usage:
+            stats = await db.import_csv('items.csv',table='items')
+        '''
+
+        return await self._write(self.db.import_csv,path,table,field_map,batch_size=batch_size)
+
+    async def import_ndjson(self,path,table,field_map=None,batch_size=10000):
+        '''
+        Coroutine version of SqliteInterface.import_ndjson.
+
+        Example usage:
+            stats = await db.import_ndjson('items.ndjson',table='items')
+        '''
+
+        return await self._write(self.db.import_ndjson,path,table,field_map,batch_size=batch_size)
+
+    def statement_cache_info(self):
+        '''
+        See SqliteInterface.statement_cache_info.
+        '''
+
+        return self.db.statement_cache_info()
+
+    @asynccontextmanager
+    async def transaction(self,commit_every=None):
+        '''
+        Async version of SqliteInterface.transaction. Writes made inside the block are committed once on exit, or
+        rolled back if an exception is raised.
+
+        The block holds the interface's write lock from entry to exit: writes awaited inside it (including from tasks
+        started inside it) run straight away, while writes from other coroutines wait until the block has committed
+        or rolled back.
+
+        In pooled mode, reads run on the reader threads and so do not see the block's uncommitted changes.
+
+        Example usage:
+            async with db.transaction():
+                await db.update_fields(table="items", update={"price": 5.0}, query='name=?', params=('Basketball',))
+                await db.delete_rows(table='items', query='stocked=0')
+
+        :param commit_every: (int) if set, commit after this many mutating calls rather than only on exit
+        '''
+
+        block = self.db.transaction(commit_every=commit_every)
+        if id(self) in _transactions.get():
+            # nested block: the outer one already holds the lock
+            async with self._block(block):
+                yield self
+            return
+
+        async with self._write_lock:
+            token = _transactions.set(_transactions.get() | {id(self)})
+            try:
+                async with self._block(block):
+                    yield self
+            finally:
+                _transactions.reset(token)
+
+    @asynccontextmanager
+    async def _block(self,block):
+
+        await self._run(self._writer,block.__enter__)
+        try:
+            yield
+        except BaseException as e:
+            await self._run(self._writer,block.__exit__,type(e),e,e.__traceback__)
+            raise
+        else:
+            await self._run(self._writer,block.__exit__,None,None,None)
+
+    def autocommit_every(self,n):
+        '''
+        Async version of SqliteInterface.autocommit_every.
+
+        Example usage:
+            async with db.autocommit_every(1000):
+                ...
+
+        :param n: (int) number of mutating calls per commit
+        '''
+
+        return self.transaction(commit_every=n)
@@ -1,6 +1,10 @@
 import pymongo
+from pymongo import InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany
+from pymongo.errors import BulkWriteError
 from bson.objectid import ObjectId
 import sys
+import time
+from itertools import islice
 
 class MongoInterface:
     def __init__(self,database,connection_str=None):
@@ -80,9 +84,10 @@ class MongoInterface:
 
         self.db[collection].delete_many(query_dict)
 
-    def delete_documents_by_id(self,collection,doc_ids,convertObjectId=True):
+    def delete_documents_by_id(self,collection,doc_ids,convertObjectId=True,batch_size=1000):
         '''
-        Deletes documents that match an input list of id's (primary keys).
+        Deletes documents that match an input list of id's (primary keys). The ids are sent batch_size at a time, with
+        one delete_many({"_id":{"$in":[...]}}) per batch.
 
         Example usage:
             db.delete_documents_by_id(collection='user',doc_ids=["6129b7e3774460dccb16f7ff"],convertObjectId=True)
@@ -90,17 +95,29 @@ class MongoInterface:
         :param collection: (str)
         :param doc_ids: List(str) ids of documents to delete. Can be either strings or ObjectId's, but must be consistent.
         :param convertObjectId: (bool) - True if doc_ids are strings which need to be converted to ObjectId's, False otherwise
+        :param batch_size: (int) number of ids per delete_many
+        :return: (int) number of documents deleted
         '''
 
-        for id in doc_ids:
+        num_deleted = 0
+        for ids in self._id_batches(self._object_ids(doc_ids,convertObjectId),batch_size):
+            num_deleted += self.db[collection].delete_many({"_id":{"$in":ids}}).deleted_count
+        return num_deleted
 
-            if convertObjectId:
-                self.db[collection].delete_one({"_id":ObjectId(id)})
-            else:
-                self.db[collection].delete_one({"_id":id})
+    def _object_ids(self,doc_ids,convertObjectId):
+
+        # converted once per list, rather than once per query
+        if convertObjectId:
+            return [ObjectId(id) for id in doc_ids]
+        return list(doc_ids)
+
+    def _id_batches(self,ids,batch_size):
+
+        for i in range(0,len(ids),batch_size):
+            yield ids[i:i + batch_size]
 
 
-    def upload_collection(self,data,collection,field_map=None,use_index_as_id=True):
+    def upload_collection(self,data,collection,field_map=None,use_index_as_id=True,batch_size=1000):
         '''
         Upload multiple documents to a database collection (existing or non-existing).
         If the collection does not exist, it will be created.
@@ -110,6 +127,11 @@ class MongoInterface:
         json-field will be the primary index. If _id is not assigned to any of the json-fields in this scenario, then
         the primary index will be automatically generated (an ObjectId).
 
+        Documents are mapped in a single pass and sent batch_size at a time with unordered insert_many calls (one round
+        trip per batch rather than per document). data may be any iterable of json's, including a generator, so the
+        whole dataset never needs to be in memory. A document that fails to insert (e.g. a duplicate _id) does not stop
+        the others in its batch; failures are reported per batch.
+
         Example usage:
         - Upload a dictionary of dictionaries to a collection called "items", using key as primary index
             db.upload_collection( data, collection='items' )
@@ -117,28 +139,66 @@ class MongoInterface:
             db.upload_collection( data, collection='items' , {"name":"item_name","price":"price"} )
         - Upload a dictionary of dictionaries, using the field _id in the documents as primary index
              db.upload_collection( data, collection='items',use_index_as_id=False )
+        - Stream documents from a file, 5000 per insert_many
+            report = db.upload_collection( (json.loads(l) for l in f), collection='items', batch_size=5000 )
 
-        :param data: list of json's (one per document)
+        :param data: dictionary of json's (key as key), or an iterable of json's (one per document)
         :param field_map: e.g. {'a':'a','b':'c'}. json-field:db-field
         :param use_index_as_id: (bool) what to set as the primary index
-        :return:
+        :param batch_size: (int) number of documents sent per insert_many
+        :return: (dict) {'documents':..,'inserted':..,'duplicates':..,'errors':.. (failures other than duplicates),
+            'batches':[{'documents':..,'inserted':..,'duplicate_ids':[..],'errors':[{'index':..,'code':..,'message':..}]},..],
+            'elapsed':.. (seconds),'docs_per_sec':..}
         '''
 
-        if type(data).__name__ == 'dict':
-            for key,entry in data.items():
-                if use_index_as_id:
-                    if field_map:
-                        field_map["_id"] = "_id"
-                    entry["_id"] = key
-                self.upload_document(entry,collection,field_map)
-        elif type(data).__name__ == 'list':
-            for i,entry in enumerate(data):
-                if use_index_as_id:
-                    if field_map:
-                        field_map["_id"] = "_id"
-                    entry["_id"] = i
-                self.upload_document(entry,collection,field_map)
+        entries = data.items() if isinstance(data,dict) else enumerate(data)
+        if use_index_as_id:
+            docs = ({**self._map_document(entry,field_map),"_id":key} for key,entry in entries)
+        else:
+            docs = (self._map_document(entry,field_map) for _,entry in entries)
+
+        num_docs = 0
+        num_inserted = 0
+        num_duplicates = 0
+        num_errors = 0
+        reports = []
+        start = time.perf_counter()
+        while True:
+            batch = list(islice(docs,batch_size))
+            if not batch:
+                break
+            report = {'documents':len(batch),'inserted':len(batch),'duplicate_ids':[],'errors':[]}
+            try:
+                self.db[collection].insert_many(batch,ordered=False)
+            except BulkWriteError as e:
+                report['inserted'] = e.details.get('nInserted',0)
+                for error in e.details.get('writeErrors',[]):
+                    if error['code'] == 11000:
+                        report['duplicate_ids'].append(batch[error['index']].get('_id'))
+                    else:
+                        report['errors'].append({'index':num_docs + error['index'],'code':error['code'],
+                                                 'message':error['errmsg']})
+            num_docs += len(batch)
+            num_inserted += report['inserted']
+            num_duplicates += len(report['duplicate_ids'])
+            num_errors += len(report['errors'])
+            reports.append(report)
+        elapsed = time.perf_counter() - start
+
+        return {'documents':num_docs,'inserted':num_inserted,'duplicates':num_duplicates,'errors':num_errors,
+                'batches':reports,'elapsed':elapsed,'docs_per_sec':num_docs/elapsed if elapsed > 0 else float('inf')}
+
+    def _map_document(self,document,field_map):
 
+        if field_map is None:
+            return document
+        doc = {}
+        for (json_field, db_field) in field_map.items():
+            if json_field in document.keys():
+                doc[db_field] = document[json_field]
+            else:
+                sys.stderr.write(f'key: {json_field} not in document.')
+        return doc
 
 
     def upload_document(self,document,collection,field_map=None):
@@ -166,22 +226,15 @@ class MongoInterface:
         :return:
         '''
 
-        if field_map is None:
-            doc = document
-        else:
-            doc = {}
-            for (json_field, db_field) in field_map.items():
-                if json_field in document.keys():
-                    doc[db_field] = document[json_field]
-                else:
-                    sys.stderr.write(f'key: {json_field} not in document.')
-
-        self.db[collection].insert_one(doc)
+        self.db[collection].insert_one(self._map_document(document,field_map))
 
-    def download_documents_by_id(self,collection,doc_ids,convertObjectId=True):
+    def download_documents_by_id(self,collection,doc_ids,convertObjectId=True,batch_size=1000):
         '''
         Queries documents with a list of id's (primary indexes). All fields within document are returned.
 
+        The ids are sent batch_size at a time, with one find({"_id":{"$in":[...]}}) per batch rather than one query
+        per id.
+
         Example usage:
         - download documents using string indexes which need to be converted to ObjectId's
             docs = db.download_documents_by_id('user', ["6129b5ff77","6129b7e377"], convertObjectId=True)
@@ -191,22 +244,23 @@ class MongoInterface:
         :param collection: (str)
         :param doc_ids: List(str) ids of documents to download. Can be either strings or ObjectId's, but must be consistent.
         :param convertObjectId: bool - True if doc_ids are strings which need to be converted to ObjectId's, False otherwise
-        :return: dictionary
+        :param batch_size: (int) number of ids per query
+        :return: dictionary (input ids as keys, in order, with None for ids that were not found)
         '''
 
-        docs = {}
-        for id in doc_ids:
+        doc_ids = list(doc_ids)
+        ids = self._object_ids(doc_ids,convertObjectId)
 
-            if convertObjectId:
-                docs[id] = self.db[collection].find_one({"_id":ObjectId(id)})
-            else:
-                docs[id] = self.db[collection].find_one({"_id":id})
+        found = {}
+        for batch in self._id_batches(ids,batch_size):
+            for doc in self.db[collection].find({"_id":{"$in":batch}}):
+                found[doc["_id"]] = doc
 
-        return docs
+        return {key:found.get(id) for key,id in zip(doc_ids,ids)}
 
 
     def download_collection(self,collection,display_fields=None,sort_field=None,ascend=True,num_results=None,
-                            output_dict=True,convertObjectId=True):
+                            output_dict=True,convertObjectId=True,batch_size=None,hint=None,max_time_ms=None):
         '''
         Reads all documents within a collection.
 
@@ -225,18 +279,24 @@ class MongoInterface:
         :param num_results: (int) limits the number of documents returned (default None returns all documents)
         :param output_dict: (bool) True: returns documents as dict values with _id as key, False: returns documents as list
         :param convertObjectId: (bool) True: only relevant if output_dict is True - keys are converted from ObjectId's to strings
+        :param batch_size: (int) see query
+        :param hint: (str) or list of (field, direction) pairs, see query
+        :param max_time_ms: (int) see query
         :return: dict or list of documents
         '''
 
-        return self.query(collection,{},display_fields,sort_field,ascend,num_results,output_dict,convertObjectId)
+        return self.query(collection,{},display_fields,sort_field,ascend,num_results,output_dict,convertObjectId,
+                          batch_size=batch_size,hint=hint,max_time_ms=max_time_ms)
 
 
 
     def query(self,collection,query_dict,display_fields=None,sort_field=None,ascend=True,num_results=None,
-              output_dict=True,convertObjectId=True):
+              output_dict=True,convertObjectId=True,batch_size=None,hint=None,max_time_ms=None):
         '''
         Returns documents within a collection that match an MQL query.
 
+        display_fields are sent to the server as a projection, so only those fields are transferred and decoded.
+
         Example usage:
         - read all users who's age is greater than 29, and display their name and age
             db.query(collection='user',query_dict= {"age": {"$gt": 29}},display_fields=['name','age'])
@@ -244,6 +304,8 @@ class MongoInterface:
             db.query(collection='user',query_dict= {"age": {"$gt": 29}},display_fields=['name','age'],sort_field='age',ascend=False)
         - return as a list instead of a dictionary
             db.query(collection='user',query_dict= {"age": {"$gt": 29}},display_fields=['name','age'],output_dict=False)
+        - use the index on age, fetch 5000 documents per round trip, and give up after 2 seconds
+            db.query(collection='user',query_dict= {"age": {"$gt": 29}},hint=[('age',1)],batch_size=5000,max_time_ms=2000)
 
          :param collection: (str)
          :param query_dict: (dict) a valid mongoDB query document e.g. {"age":{"$gt":29}}
@@ -253,10 +315,83 @@ class MongoInterface:
          :param num_results: (int) limits the number of documents read and returned (default None returns all documents matching the query)
          :param output_dict: (bool) True: returns documents as dict values with _id as key, False: returns documents as list
          :param convertObjectId: (bool) True: only relevant if output_dict is True - keys are converted from ObjectId's to strings
+         :param batch_size: (int) number of documents the cursor fetches per round trip (default None uses the server's default)
+         :param hint: (str) name of the index to use, or list of (field, direction) pairs of its key e.g. [('age',1)]
+         :param max_time_ms: (int) the query is aborted (raising pymongo.errors.ExecutionTimeout) after this many milliseconds
          :return: dict or list of documents
          '''
 
-        results = self.db[collection].find(query_dict)
+        docs = self.iter_query(collection,query_dict,display_fields,sort_field,ascend,num_results,output_dict,
+                               convertObjectId,batch_size=batch_size,hint=hint,max_time_ms=max_time_ms)
+        if output_dict:
+            return dict(docs)
+        return list(docs)
+
+    def iter_query(self,collection,query_dict,display_fields=None,sort_field=None,ascend=True,num_results=None,
+                   output_dict=True,convertObjectId=True,batch_size=1000,hint=None,max_time_ms=None):
+        '''
+        Stream the documents that match an MQL query, rather than returning them all at once.
+
+        Takes the same arguments as query, but documents are yielded as the cursor fetches them from the server,
+        batch_size at a time, so memory stays flat regardless of the number of documents. The cursor is closed when
+        the generator is exhausted or closed.
+
+        Example usage:
+        - stream (key, document) pairs
+            for key,doc in db.iter_query(collection='user',query_dict={"age":{"$gt":29}},display_fields=['name','age']):
+                ...
+        - stream documents only
+            for doc in db.iter_query(collection='user',query_dict={"age":{"$gt":29}},output_dict=False):
+                ...
+        - dict(db.iter_query(collection='user',query_dict=q)) is equivalent to db.query(collection='user',query_dict=q)
+
+        :param output_dict: (bool) True: yields (_id, document) pairs, False: yields documents
+        :param batch_size: (int) number of documents the cursor fetches per round trip
+        :return: generator of (key, document) pairs or documents
+        '''
+
+        results = self._find(collection,query_dict,display_fields,sort_field,ascend,num_results,batch_size,hint,
+                             max_time_ms)
+        try:
+            for result in results:
+                if display_fields:
+                    doc = {}
+                    for field in display_fields:
+                        if field in result.keys():
+                            doc[field] = result[field]
+                    filtered_result = doc
+                else:
+                    filtered_result = result
+
+                if output_dict:
+                    yield self._document_key(result,convertObjectId),filtered_result
+                else:
+                    yield filtered_result
+        finally:
+            results.close()
+
+    def iter_collection(self,collection,display_fields=None,sort_field=None,ascend=True,num_results=None,
+                        output_dict=True,convertObjectId=True,batch_size=1000,hint=None,max_time_ms=None):
+        '''
+        Stream all documents within a collection (see iter_query).
+
+        Example usage:
+        - export a collection to a newline-delimited json file, in constant memory
+            for doc in db.iter_collection(collection='items',output_dict=False,batch_size=5000):
+                f.write(json_util.dumps(doc) + '\\n')
+
+        :return: generator of (key, document) pairs or documents
+        '''
+
+        return self.iter_query(collection,{},display_fields,sort_field,ascend,num_results,output_dict,convertObjectId,
+                               batch_size=batch_size,hint=hint,max_time_ms=max_time_ms)
+
+    def _find(self,collection,query_dict,display_fields,sort_field,ascend,num_results,batch_size,hint,max_time_ms):
+
+        # _id is always projected, as it is the key of the returned dictionary (it is dropped from the documents
+        # afterwards unless it is one of the display_fields)
+        projection = {field:1 for field in display_fields} if display_fields else None
+        results = self.db[collection].find(query_dict,projection)
 
         if sort_field:
             if ascend:
@@ -267,36 +402,110 @@ class MongoInterface:
 
         if num_results:
             results = results.limit(num_results)
+        if batch_size:
+            results = results.batch_size(batch_size)
+        if hint:
+            results = results.hint(hint)
+        if max_time_ms:
+            results = results.max_time_ms(max_time_ms)
 
-        if output_dict:
-            docs = {}
-        else:
-            docs = []
-        for result in results:
-            if display_fields:
-                doc = {}
-                for field in display_fields:
-                    if field in result.keys():
-                        doc[field] = result[field]
-                filtered_result = doc
-            else:
-                filtered_result = result
+        return results
 
-            if output_dict:
-                if convertObjectId:
-                    if type(result["_id"]).__name__ == 'ObjectId':
-                        key = str(result["_id"])
-                    else:
-                        key = result["_id"]
-                else:
-                    key = result["_id"]
-                docs[key] = filtered_result
-            else:
-                docs.append(filtered_result)
+    def _document_key(self,result,convertObjectId):
 
-        return docs
+        if convertObjectId and type(result["_id"]).__name__ == 'ObjectId':
+            return str(result["_id"])
+        return result["_id"]
 
 
+    def bulk_write(self,collection,operations,ordered=True,batch_size=1000,convertObjectId=True):
+        '''
+        Apply a stream of mixed write operations, sent batch_size at a time with pymongo's bulk_write (one round trip
+        per batch rather than per operation).
+
+        Each operation is a dictionary, with 'op' one of:
+        - {'op':'insert','doc':{...}}
+        - {'op':'update','id':..,'update':{"$set":{...}}} updates the document with that id (add 'upsert':True to
+          insert it if it does not exist)
+        - {'op':'update','query':{...},'update':{...}} updates every document that matches an MQL query
+        - {'op':'replace','id':..,'doc':{...}} replaces the document with that id (add 'upsert':True to insert it if
+          it does not exist)
+        - {'op':'delete','id':..} or {'op':'delete','query':{...}} deletes the document with that id, or every
+          document that matches the query
+
+        With ordered=True, operations are applied in order and processing stops at the first one that fails. With
+        ordered=False, the server may apply them in any order, and a failure does not stop the others.
+
+        Example usage:
+            ops = [{'op':'insert','doc':{"name":"ball","price":5}},
+                   {'op':'update','id':"61274b65",'update':{"$set":{"price":7}}},
+                   {'op':'delete','query':{"stocked":False}}]
+            report = db.bulk_write(collection='items',operations=ops)
+
+        :param collection: (str)
+        :param operations: iterable (including a generator) of operation dictionaries
+        :param ordered: (bool) True: apply in order and stop at the first error, False: apply in any order
+        :param batch_size: (int) number of operations sent per bulk_write
+        :param convertObjectId: (bool) True if the 'id's are strings which need to be converted to ObjectId's
+        :return: (dict) {'operations':..,'inserted':..,'matched':..,'modified':..,'deleted':..,'upserted':..,
+            'upserted_ids':{operation index: _id},'errors':[{'index':..,'code':..,'message':..}],'batches':..}
+        '''
+
+        report = {'operations':0,'inserted':0,'matched':0,'modified':0,'deleted':0,'upserted':0,'upserted_ids':{},
+                  'errors':[],'batches':0}
+        operations = iter(operations)
+        while True:
+            batch = [self._write_operation(operation,convertObjectId) for operation in islice(operations,batch_size)]
+            if not batch:
+                break
+            try:
+                details = self.db[collection].bulk_write(batch,ordered=ordered).bulk_api_result
+            except BulkWriteError as e:
+                details = e.details
+
+            offset = report['operations']
+            report['operations'] += len(batch)
+            report['batches'] += 1
+            report['inserted'] += details.get('nInserted',0)
+            report['matched'] += details.get('nMatched',0)
+            report['modified'] += details.get('nModified',0)
+            report['deleted'] += details.get('nRemoved',0)
+            report['upserted'] += details.get('nUpserted',0)
+            for upsert in details.get('upserted',[]):
+                report['upserted_ids'][offset + upsert['index']] = upsert['_id']
+            for error in details.get('writeErrors',[]):
+                report['errors'].append({'index':offset + error['index'],'code':error['code'],
+                                         'message':error['errmsg']})
+            if ordered and details.get('writeErrors'):
+                break
+
+        return report
+
+    def _write_operation(self,operation,convertObjectId):
+
+        op = operation['op']
+        if op not in ('insert','update','replace','delete'):
+            raise ValueError(f"unknown operation {op!r}, use one of 'insert', 'update', 'replace' or 'delete'")
+        if op == 'insert':
+            return InsertOne(operation['doc'])
+
+        if 'id' in operation:
+            query_dict = {"_id":ObjectId(operation['id']) if convertObjectId else operation['id']}
+        else:
+            query_dict = operation.get('query')
+
+        if query_dict is None:
+            raise ValueError(f"a {op!r} operation needs an 'id' or a 'query': {operation!r}")
+        if op == 'update':
+            if 'id' in operation:
+                return UpdateOne(query_dict,operation['update'],upsert=operation.get('upsert',False))
+            return UpdateMany(query_dict,operation['update'],upsert=operation.get('upsert',False))
+        if op == 'replace':
+            return ReplaceOne(query_dict,operation['doc'],upsert=operation.get('upsert',False))
+        if 'id' in operation:
+            return DeleteOne(query_dict)
+        return DeleteMany(query_dict)
+
     def update_fields_by_query(self,collection,query_dict,update_dict):
         '''
         Updates the fields of documents that match a query.
@@ -314,11 +523,13 @@ class MongoInterface:
 
         self.db[collection].update_many(query_dict,update_dict)
 
-    def update_fields_by_id(self,collection,doc_ids,update_dict,convertObjectId=True):
+    def update_fields_by_id(self,collection,doc_ids,update_dict,convertObjectId=True,batch_size=1000):
         '''
         Updates the fields of documents that match an input list of id's (primary keys).
         If a field doesn't exist within the document then it will be created.
 
+        The ids are sent batch_size at a time, with one update_many({"_id":{"$in":[...]}}) per batch.
+
         Example usage:
             db.update_fields_by_id(collection='user',doc_ids=["61274b65","612752"],update_dict={"$set":{"employed":True}},convertObjectId=True)
 
@@ -326,16 +537,11 @@ class MongoInterface:
         :param doc_ids: List(str) ids of documents to update. Can be either strings or ObjectId's, but must be consistent.
         :param update_dict: (dict) a valid mongoDB update document e.g. {"$set":{"status":True}}
         :param convertObjectId: (bool) - True if doc_ids are strings which need to be converted to ObjectId's, False otherwise
+        :param batch_size: (int) number of ids per update_many
+        :return: (int) number of documents modified
         '''
 
-        for id in doc_ids:
-
-            if convertObjectId:
-                self.db[collection].update_one({"_id":ObjectId(id)},update_dict)
-            else:
-                self.db[collection].update_one({"_id":id},update_dict)
-
-
-
-
-
+        num_modified = 0
+        for ids in self._id_batches(self._object_ids(doc_ids,convertObjectId),batch_size):
+            num_modified += self.db[collection].update_many({"_id":{"$in":ids}},update_dict).modified_count
+        return num_modified
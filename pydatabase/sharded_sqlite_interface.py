@@ -0,0 +1,412 @@
+import math
+import time
+import zlib
+from array import array
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from pydatabase.sqlite_interface import SqliteInterface, WorkerMapping
+
+
+def _shard_index(key,num_shards):
+    '''
+    Shard that owns a primary key. Stable across processes (unlike hash()), so rows are found on the same shard the
+    next time the database is opened.
+    '''
+
+    return zlib.crc32(repr(key).encode()) % num_shards
+
+
+def _affinity_key(key,declared):
+    '''
+    A primary key value converted as sqlite would store it in a column of the declared type (type affinity), so that
+    values that are the same key in that column (e.g. '5', 5 and 5.0 in an INTEGER column) go to the same shard.
+    '''
+
+    declared = declared.upper()
+    if 'INT' in declared:
+        affinity = 'integer'
+    elif 'CHAR' in declared or 'CLOB' in declared or 'TEXT' in declared:
+        return str(key) if isinstance(key,(int,float)) else key
+    elif 'BLOB' in declared or not declared:
+        return key
+    elif 'REAL' in declared or 'FLOA' in declared or 'DOUB' in declared:
+        affinity = 'real'
+    else:
+        affinity = 'numeric'
+
+    if isinstance(key,str) and '_' not in key:
+        # a string is only stored as a number if it is a well-formed (finite) one
+        for convert in (int,float):
+            try:
+                number = convert(key)
+            except ValueError:
+                continue
+            if math.isfinite(number):
+                key = number
+            break
+    if isinstance(key,bool) or not isinstance(key,(int,float)):
+        return key
+    if affinity == 'real':
+        return float(key)
+    if isinstance(key,float) and key.is_integer() and -2**63 <= key < 2**63:
+        return int(key)
+    return key
+
+
+def _merge_columns(columns):
+
+    # columns from each shard, as returned by query with output='columns', 'numpy' or 'structured'
+    if not isinstance(columns[0],dict):
+        import numpy as np
+        return np.concatenate(columns)
+
+    merged = {}
+    for field in columns[0]:
+        parts = [shard_columns[field] for shard_columns in columns]
+        if isinstance(parts[0],(list,array)):
+            merged[field] = parts[0]
+            for part in parts[1:]:
+                if isinstance(merged[field],array) and not isinstance(part,array):
+                    merged[field] = list(merged[field])
+                merged[field].extend(part)
+        else:
+            import numpy as np
+            merged[field] = np.concatenate(parts)
+    return merged
+
+
+class ShardedSqliteInterface:
+    def __init__(self,db_paths,statement_cache_size=128,profile=None):
+        '''
+        SqliteInterface over several sqlite3 database files (shards) with the same tables, so that writes to different
+        shards run in parallel rather than queueing for a single file's write lock.
+
+        Rows are routed to a shard by a hash of their primary key: insert_row, insert_rows, upsert_rows and
+        update_rows_by_key only write to the shards that own the rows. query, query_iter, get_distinct_values,
+        delete_rows, update_fields, clear_table and the schema methods run on every shard in parallel, and their
+        results are merged (rows are grouped by shard, not in any global order). Every shard has its own SqliteInterface
+        and worker thread. Each shard commits on its own, so a write to several shards is not atomic.
+
+        The shards must be opened in the same order every time, as the order determines which shard owns which keys.
+
+        Example usage:
+            db = ShardedSqliteInterface(['shop0.db','shop1.db','shop2.db','shop3.db'])
+            db.sql_command("create table items (name text primary key, category text, price real, stocked integer);",modify_db=True)
+            db.insert_rows(entries=data,table="items",field_map={"name":"name","price":"cost"})
+            queries = db.query(table='items',query='price<?',params=(50,))
+            db.close()
+
+        :param db_paths: list(str) paths to the sqlite3 database files, one per shard
+        :param statement_cache_size: (int) see SqliteInterface
+        :param profile: (str) or (dict) see SqliteInterface
+        '''
+
+        self.db_paths = list(db_paths)
+        if not self.db_paths:
+            raise ValueError("at least one shard is needed")
+
+        self._executors = [ThreadPoolExecutor(max_workers=1,thread_name_prefix=f'sqlite-shard{i}')
+                           for i in range(len(self.db_paths))]
+        futures = [executor.submit(SqliteInterface,path,statement_cache_size=statement_cache_size,profile=profile)
+                   for executor,path in zip(self._executors,self.db_paths)]
+        self.shards = [future.result() for future in futures]
+        # primary key (and its declared type) of each table, looked up once (on shard 0's thread) rather than on every
+        # routed write
+        self._key_fields = {}
+
+    @property
+    def tables(self):
+        return self._executors[0].submit(lambda: self.shards[0].tables).result()
+
+    @property
+    def fields(self):
+        return WorkerMapping(self.shards[0].fields,self._executors[0])
+
+    @property
+    def field_info(self):
+        return WorkerMapping(self.shards[0].field_info,self._executors[0])
+
+    @property
+    def primary_key(self):
+        return WorkerMapping(self.shards[0].primary_key,self._executors[0])
+
+    def shard_index(self,key,table=None):
+        '''
+        Index (in db_paths) of the shard that owns a primary key.
+
+        Example usage:
+            path = db.db_paths[db.shard_index('Football')]
+        - a key given as a string, in a table with an INTEGER primary key
+            path = db.db_paths[db.shard_index('42',table='orders')]
+
+        :param key: primary key value
+        :param table: (str) table the key belongs to. If given, the key is first converted to the type of the table's
+            primary key (as rows are routed by insert_row, insert_rows, etc.)
+        :return: (int)
+        '''
+
+        if table is not None:
+            key = _affinity_key(key,self._key_field(table)[1])
+        return _shard_index(key,len(self.shards))
+
+    def _fan_out(self,method,*args,**kwargs):
+
+        # run a SqliteInterface method on every shard in parallel, and return the results in shard order
+        futures = [executor.submit(getattr(shard,method),*args,**kwargs)
+                   for executor,shard in zip(self._executors,self.shards)]
+        return [future.result() for future in futures]
+
+    def _key_field(self,table):
+
+        # (name, declared type) of the table's primary key
+        key = self._key_fields.get(table)
+        if key is None:
+            info = self._executors[0].submit(self.shards[0]._table_schema,table).result()
+            if 'primary_key' not in info:
+                raise ValueError(f"table '{table}' has no primary key to shard rows by")
+            key_field = info['primary_key']
+            key = self._key_fields[table] = (key_field,info['field_info'][key_field]['type'])
+        return key
+
+    def close(self):
+        '''
+        Disconnect safely from every shard and stop the worker threads.
+
+        :return:
+        '''
+
+        try:
+            self._fan_out('close')
+        finally:
+            for executor in self._executors:
+                executor.shutdown()
+
+    def insert_row(self,entry,table,field_map):
+        '''
+        Insert a single row (via json) into the shard that owns its primary key (see SqliteInterface.insert_row).
+
+        Example usage:
+            db.insert_row(entry={"name":ball,"cost":20.0},table="items",field_map={"name":"name","price":"cost"})
+        '''
+
+        i = self.shard_index(entry.get(field_map[self._key_field(table)[0]]),table)
+        return self._executors[i].submit(self.shards[i].insert_row,entry,table,field_map).result()
+
+    def insert_rows(self,entries,table,field_map,batch_size=10000):
+        '''
+        Insert many rows (via json), each into the shard that owns its primary key (see SqliteInterface.insert_rows).
+        Rows are split into per-shard batches of batch_size, and the shards write their batches in parallel.
+
+        Example usage:
+            stats = db.insert_rows(entries=data,table="items",field_map={"name":"name","price":"cost"})
+
+        :return: (dict) throughput stats, summed over the shards: {'rows':..,'batches':..,'elapsed':.. (seconds),'rows_per_sec':..}
+        '''
+
+        key_field,declared = self._key_field(table)
+        json_key = field_map[key_field]
+        return self._route(entries,lambda entry: _affinity_key(entry.get(json_key),declared),batch_size,
+                           lambda shard,batch: shard.insert_rows(batch,table,field_map,batch_size=batch_size))
+
+    def upsert_rows(self,entries,table,field_map,batch_size=10000):
+        '''
+        Insert many rows (via json), updating the existing row instead wherever the primary key already exists, on the
+        shards that own them (see SqliteInterface.upsert_rows).
+
+        Example usage:
+            stats = db.upsert_rows(entries=feed,table="items",field_map={"name":"name","category":"category","price":"cost","stocked":"stocked"})
+
+        :return: (dict) throughput stats, summed over the shards (see insert_rows)
+        '''
+
+        key_field,declared = self._key_field(table)
+        json_key = field_map[key_field]
+        return self._route(entries,lambda entry: _affinity_key(entry.get(json_key),declared),batch_size,
+                           lambda shard,batch: shard.upsert_rows(batch,table,field_map,batch_size=batch_size))
+
+    def update_rows_by_key(self,table,updates,batch_size=10000):
+        '''
+        Update specific fields of many rows, each identified by its primary key, on the shards that own them (see
+        SqliteInterface.update_rows_by_key).
+
+        Example usage:
+            stats = db.update_rows_by_key(table="items",updates={"Football":{"price":45.0},"Basketball":{"price":25.0}})
+
+        :return: (dict) throughput stats, summed over the shards (see insert_rows)
+        '''
+
+        declared = self._key_field(table)[1]
+        if isinstance(updates,Mapping):
+            updates = updates.items()
+        return self._route(updates,lambda item: _affinity_key(item[0],declared),batch_size,
+                           lambda shard,batch: shard.update_rows_by_key(table,batch,batch_size=batch_size))
+
+    def _route(self,items,key_of,batch_size,write):
+
+        # write(shard, batch) writes a batch of items to a shard and returns its stats. Items are split into per-shard
+        # batches, each written on its shard's thread while the next ones are routed. At most one batch per shard is in
+        # flight, so memory stays bounded for a generator of any length.
+        num_shards = len(self.shards)
+        buffers = [[] for _ in range(num_shards)]
+        pending = [None] * num_shards
+        stats = []
+        start = time.perf_counter()
+
+        def submit(i):
+            if pending[i] is not None:
+                stats.append(pending[i].result())
+            pending[i] = self._executors[i].submit(write,self.shards[i],buffers[i])
+            buffers[i] = []
+
+        try:
+            for item in items:
+                i = _shard_index(key_of(item),num_shards)
+                buffers[i].append(item)
+                if len(buffers[i]) >= batch_size:
+                    submit(i)
+            for i in range(num_shards):
+                if buffers[i]:
+                    submit(i)
+        finally:
+            for future in pending:
+                if future is not None:
+                    stats.append(future.result())
+        elapsed = time.perf_counter() - start
+
+        num_rows = sum(s['rows'] for s in stats)
+        return {'rows':num_rows,'changed':sum(s['changed'] for s in stats),'batches':sum(s['batches'] for s in stats),
+                'elapsed':elapsed,'rows_per_sec':num_rows/elapsed if elapsed > 0 else float('inf')}
+
+    def query(self,table,display_fields=None,query=None,output_json=False,params=None,output=None,batch_size=10000,
+              compact_rows=False):
+        '''
+        Query every shard in parallel and merge the results (see SqliteInterface.query). Rows are grouped by shard.
+
+        Example usage:
+            queries = db.query(table='items',display_fields=('name','price'),query='price<?',params=(50,))
+        '''
+
+        results = self._fan_out('query',table,display_fields,query,output_json=output_json,params=params,
+                                output=output,batch_size=batch_size,compact_rows=compact_rows)
+        if output is not None:
+            return _merge_columns(results)
+        if output_json:
+            merged = {}
+            for result in results:
+                merged.update(result)
+            return merged
+        return [row for result in results for row in result]
+
+    def query_iter(self,table,display_fields=None,query=None,batch_size=1000,output_json=False,params=None,
+                   compact_rows=False):
+        '''
+        Stream the results of a query, one shard after the other (see SqliteInterface.query_iter).
+
+        Example usage:
+            for name,price in db.query_iter(table='items',display_fields=('name','price')):
+                ...
+
+        :return: generator of tuples
+        '''
+
+        for executor,shard in zip(self._executors,self.shards):
+            rows = executor.submit(shard.query_iter,table,display_fields,query,batch_size=batch_size,
+                                   output_json=output_json,params=params,compact_rows=compact_rows).result()
+            try:
+                while True:
+                    batch = executor.submit(lambda: list(islice(rows,batch_size))).result()
+                    if not batch:
+                        break
+                    yield from batch
+            finally:
+                executor.submit(rows.close).result()
+
+    def get_distinct_values(self,table,field):
+        '''
+        Return unique values for a given field, across all shards (see SqliteInterface.get_distinct_values).
+
+        Example usage:
+            queries = db.get_distinct_values(table='items', field='category')
+        '''
+
+        return list(dict.fromkeys(row for result in self._fan_out('get_distinct_values',table,field)
+                                  for row in result))
+
+    def delete_rows(self,table,query,params=None):
+        '''
+        Delete rows which satisfy the condition in query, on every shard (see SqliteInterface.delete_rows).
+
+        Example usage:
+            db.delete_rows(table='items',query='category=?',params=('Sporting Goods',))
+        '''
+
+        self._fan_out('delete_rows',table,query,params=params)
+
+    def update_fields(self,table,update,query,params=None):
+        '''
+        Update specific fields of the rows which satisfy the condition in query, on every shard (see
+        SqliteInterface.update_fields). Updating the primary key would leave rows on the wrong shard.
+
+        Example usage:
+            db.update_fields(table="items", update={"price": 5.0}, query='name=?', params=('Basketball',))
+        '''
+
+        self._fan_out('update_fields',table,update,query,params=params)
+
+    def clear_table(self,table):
+        '''
+        Clears all rows from table on every shard.
+
+        Example usage:
+            db.clear_table(table="items")
+        '''
+
+        self._fan_out('clear_table',table)
+
+    def delete_table(self,table):
+        '''
+        Delete an entire table from every shard.
+
+        Example usage:
+            db.delete_table(table='items')
+        '''
+
+        self._key_fields.pop(table,None)
+        self._fan_out('delete_table',table)
+
+    def create_index(self,table,fields,name=None,unique=False):
+        '''
+        Create an index on every shard (see SqliteInterface.create_index). A unique index is only enforced per shard.
+
+        Example usage:
+            db.create_index(table='items',fields=('category',))
+        '''
+
+        return self._fan_out('create_index',table,fields,name=name,unique=unique)[0]
+
+    def drop_index(self,name):
+        '''
+        Delete an index (if it exists) from every shard.
+
+        Example usage:
+            db.drop_index(name='idx_items_category')
+        '''
+
+        self._fan_out('drop_index',name)
+
+    def sql_command(self,command,modify_db=False):
+        '''
+        Perform an sqlite command on every shard, e.g. to create a table (see SqliteInterface.sql_command). Results are
+        concatenated in shard order.
+
+        Example usage:
+            db.sql_command("create table items (name text primary key, price real);",modify_db=True)
+        '''
+
+        if modify_db:
+            self._key_fields.clear()
+        results = self._fan_out('sql_command',command,modify_db)
+        if not modify_db:
+            return [row for result in results for row in result]
@@ -1,36 +1,508 @@
+import base64
+import csv
+import json
+import os
+import queue
+import re
+import warnings
+from array import array
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from itertools import islice
+from operator import itemgetter
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+
+# schema metadata shared by all interfaces opened on the same database file, keyed by absolute path
+_schema_cache = {}
+_schema_cache_lock = threading.Lock()
+
+
+class _SchemaMapping(Mapping):
+    '''
+    Read-only {table: value} view over the lazily loaded schema metadata of an interface (e.g. db.fields).
+    '''
+
+    def __init__(self,interface,kind):
+        self._interface = interface
+        self._kind = kind
+
+    def __getitem__(self,table):
+        info = self._interface._table_schema(table)
+        if self._kind not in info:
+            raise KeyError(table)
+        value = info[self._kind]
+        # copies of the (shared) cached lists, so that callers cannot change them
+        return list(value) if isinstance(value,list) else value
+
+    def __iter__(self):
+        return (table for table in self._interface.tables if self._kind in self._interface._table_schema(table))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class WorkerMapping(Mapping):
+    '''
+    Read-only view of one of an interface's lazily loaded schema mappings (e.g. db.fields), whose lookups run on the
+    worker thread (executor) that owns the interface's connection, as used by AsyncSqliteInterface and
+    ShardedSqliteInterface. Lookups block the calling thread until the worker is free.
+    '''
+
+    def __init__(self,mapping,executor):
+        self._mapping = mapping
+        self._executor = executor
+
+    def __getitem__(self,table):
+        return self._executor.submit(self._mapping.__getitem__,table).result()
+
+    def __iter__(self):
+        return iter(self._executor.submit(list,self._mapping).result())
+
+    def __len__(self):
+        return self._executor.submit(len,self._mapping).result()
+
+    def __repr__(self):
+        return repr(self._executor.submit(dict,self._mapping).result())
+
+
+class _ResultCache:
+    '''
+    Thread-safe LRU cache of query results, with an optional time-to-live and per-table invalidation.
+
+    Each entry records the table it was read from. Invalidating a table drops its entries and bumps the table's
+    generation, so a result loaded concurrently with a write (from before the write) is not stored.
+    '''
+
+    def __init__(self,max_size,ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.data_version = None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._table_keys = {}
+        self._generations = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def token(self,table):
+        with self._lock:
+            return self._generation,self._generations.get(table,0)
+
+    def get(self,key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True,entry[2]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return False,None
+
+    def put(self,key,table,value,token):
+        with self._lock:
+            if token != (self._generation,self._generations.get(table,0)):
+                return
+            expires = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[key] = (table,expires,value)
+            self._entries.move_to_end(key)
+            self._table_keys.setdefault(table,set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self,table=None):
+        with self._lock:
+            self.invalidations += 1
+            if table is None:
+                self._generation += 1
+                self._entries.clear()
+                self._table_keys.clear()
+            else:
+                self._generations[table] = self._generations.get(table,0) + 1
+                for key in self._table_keys.pop(table,()):
+                    del self._entries[key]
+
+    def info(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits':self.hits,'misses':self.misses,'hit_rate':self.hits/lookups if lookups else 0.0,
+                    'invalidations':self.invalidations,'size':len(self._entries),'max_size':self.max_size,
+                    'ttl':self.ttl}
+
+    def _remove(self,key):
+        table = self._entries.pop(key)[0]
+        keys = self._table_keys.get(table)
+        if keys is not None:
+            keys.discard(key)
+
+
+# aggregate functions accepted by SqliteInterface.aggregate, with the sql they map to
+_AGGREGATES = {'count':'count({})','count_distinct':'count(distinct {})','sum':'sum({})','total':'total({})',
+               'avg':'avg({})','min':'min({})','max':'max({})','group_concat':'group_concat({})'}
+
+
+# named sets of pragmas accepted by SqliteInterface(profile=...). cache_size is in KiB when negative.
+PROFILES = {
+    # full durability: every commit is synced to disk, readers do not block the writer
+    'durable':{'journal_mode':'wal','synchronous':'full','cache_size':-8192,'temp_store':'default'},
+    # many reads, few writes: large page cache and memory-mapped reads. A commit is durable once the WAL is
+    # checkpointed, and a crash can only lose the most recent commits, never corrupt the database.
+    'read_heavy':{'page_size':4096,'journal_mode':'wal','synchronous':'normal','cache_size':-65536,
+                  'mmap_size':268435456,'temp_store':'memory'},
+    # loading data that can be reloaded from its source: no syncs, and the rollback journal is kept in memory, so a
+    # crash (of the process or the machine) during a write may corrupt the database
+    'bulk_load':{'page_size':8192,'journal_mode':'memory','synchronous':'off','cache_size':-262144,
+                 'temp_store':'memory'},
+}
+
+# the order pragmas are applied in (page_size only applies before the database is created or switched to WAL)
+_PRAGMAS = ('page_size','journal_mode','synchronous','cache_size','mmap_size','temp_store')
+# pragmas that only affect the connection they are set on, and so also apply to the read-only connections
+_CONNECTION_PRAGMAS = ('cache_size','mmap_size','temp_store')
+
+
+def _profile_pragmas(profile):
+
+    if profile is None:
+        return {}
+    if isinstance(profile,str):
+        if profile not in PROFILES:
+            raise ValueError(f"unknown profile {profile!r}, use one of {', '.join(PROFILES)} or a dictionary of pragmas")
+        return dict(PROFILES[profile])
+    unknown = set(profile) - set(_PRAGMAS)
+    if unknown:
+        raise ValueError(f"unsupported pragmas {', '.join(sorted(unknown))}, use any of {', '.join(_PRAGMAS)}")
+    return dict(profile)
+
+
+def _apply_pragmas(connection,pragmas,names=_PRAGMAS):
+
+    for name in names:
+        if name in pragmas:
+            connection.execute(f"pragma {name}={pragmas[name]};").fetchall()
+
+
+def _read_only_uri(db_path):
+
+    return f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+
+
+def _read_partition(db_path,command,params):
+
+    # module level, so it can be sent to a process pool
+    connection = sqlite3.connect(_read_only_uri(db_path),uri=True)
+    try:
+        return connection.execute(command,params).fetchall()
+    finally:
+        connection.close()
+
+
+def _params_key(params):
+
+    if params is None:
+        return ()
+    if isinstance(params,Mapping):
+        return tuple(sorted(params.items()))
+    return tuple(params)
+
+
+class QueryPlanWarning(UserWarning):
+    '''
+    Warning raised by SqliteInterface's query diagnostics when a statement does a full scan of a large table.
+    '''
+
+
+def _column_typecode(info):
+    '''
+    array.array typecode for a column's declared type, following sqlite's type affinity rules (None if not numeric).
+    '''
+
+    if info is None:
+        return None
+    declared = info['type'].upper()
+    if 'INT' in declared:
+        return 'q'
+    if 'CHAR' in declared or 'CLOB' in declared or 'TEXT' in declared or 'BLOB' in declared:
+        return None
+    if 'REAL' in declared or 'FLOA' in declared or 'DOUB' in declared:
+        return 'd'
+    return None
+
+
+def _text_affinity(info):
+    '''
+    True if a column's declared type has TEXT affinity (so an empty string is a valid value rather than a NULL).
+    '''
+
+    declared = info['type'].upper()
+    return 'INT' not in declared and ('CHAR' in declared or 'CLOB' in declared or 'TEXT' in declared)
+
+
+def _json_default(value):
+    '''
+    json.dumps fallback for the sqlite types json has no equivalent of: BLOBs are written as base64 strings.
+    '''
+
+    if isinstance(value,(bytes,memoryview)):
+        return base64.b64encode(value).decode('ascii')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_page_token(values):
+    '''
+    query_page continuation token for the key values of the last row of a page. BLOBs (which json has no equivalent
+    of) are written as {"blob": base64 string}, as no other sqlite value decodes to a dictionary.
+    '''
+
+    values = [{'blob':base64.b64encode(value).decode('ascii')} if isinstance(value,(bytes,memoryview)) else value
+              for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _decode_page_token(token):
+
+    return [base64.b64decode(value['blob']) if isinstance(value,dict) else value
+            for value in json.loads(base64.urlsafe_b64decode(token.encode()))]
+
+
+class Row(sqlite3.Row):
+    '''
+    Compact, read-only result row, returned by query and query_iter with compact_rows=True.
+
+    A row can be used as a dictionary (row['price'], row.get('price'), keys(), values(), items(), dict(row), and
+    comparing equal to a dictionary with the same items), through attributes (row.price), or by position (row[0]).
+    Iterating over a row yields its values, as for a tuple. The rows of a query share one description of the field
+    names, and each only stores a tuple of values, so they are much smaller and faster to build than dictionaries.
+    '''
+
+    __slots__ = ()
+
+    def __getattr__(self,name):
+        try:
+            return self[name]
+        except IndexError:
+            raise AttributeError(name) from None
+
+    def get(self,key,default=None):
+        try:
+            return self[key]
+        except IndexError:
+            return default
+
+    def values(self):
+        return tuple(self)
+
+    def items(self):
+        return list(zip(self.keys(),self))
+
+    def __contains__(self,key):
+        return key in self.keys()
+
+    def __eq__(self,other):
+        if isinstance(other,Mapping):
+            return dict(self.items()) == dict(other.items())
+        return super().__eq__(other)
+
+    __hash__ = sqlite3.Row.__hash__
+
+    def __repr__(self):
+        return f"Row({dict(self.items())!r})"
 
 
 class SqliteInterface:
-    def __init__(self,db_path):
+    def __init__(self,db_path,statement_cache_size=128,pool_size=None,in_memory=False,flush_interval=None,
+                 profile=None):
+        '''
+
+        By default the interface uses a single connection, which can only be used from the thread that created it.
+
+        If pool_size is set, the interface can be shared between threads: the database is switched to WAL journaling,
+        all writes go through a single writer connection (serialised by a lock), and query, query_iter and
+        get_distinct_values borrow one of up to pool_size read-only connections for the duration of the call. Reads
+        therefore run in parallel with each other and with the writer, and see the last committed state of the
+        database (reads issued by the thread inside a transaction block see that transaction's uncommitted changes).
+
+        If in_memory is set, the whole database is copied into an in-memory working copy when the interface is opened
+        (with the sqlite3 backup API), and every read and write is served from RAM. Committed changes are copied back
+        to the file by flush(), on close(), and every flush_interval seconds by a background thread (or after every
+        commit if flush_interval is 0). Each flush copies the whole database, so the mode suits databases that fit
+        comfortably in memory and are read far more often than they are written. Changes made to the file by other
+        connections are not seen, and are overwritten by the next flush.
+
+        profile selects a set of pragmas (journal mode, synchronous, page cache and mmap sizes, ...) that are applied to
+        the connections when they are opened. The named profiles are listed in PROFILES: 'durable', 'read_heavy' and
+        'bulk_load' (see examples/benchmark_profiles.py to measure them on your data). Without a profile, sqlite's
+        defaults are used. page_size only takes effect for a new (empty) database, and pooled mode always uses WAL
+        journaling whatever the profile's journal_mode.
+
+        Example usage:
+        - share one interface between worker threads, with up to 8 concurrent readers
+            db = SqliteInterface('../data/shop.db',pool_size=8)
+        - serve reads from memory, writing changes back to the file every 60 seconds
+            db = SqliteInterface('../data/shop.db',in_memory=True,flush_interval=60)
+        - a large page cache and memory-mapped reads
+            db = SqliteInterface('../data/shop.db',profile='read_heavy')
+        - custom pragmas
+            db = SqliteInterface('../data/shop.db',profile={'synchronous':'normal','cache_size':-32768})
+
+        :param db_path: (str) path to an existing sqlite3 database
+        :param statement_cache_size: (int) number of generated statements memoized by the interface (and compiled
+            statements kept by sqlite3)
+        :param pool_size: (int) if set, maximum number of read-only connections in the thread-safe pooled mode
+        :param in_memory: (bool) True: work on an in-memory copy of the database, flushed back to db_path
+        :param flush_interval: (float) only relevant if in_memory is set - seconds between background flushes. Default
+            None only flushes on flush() and close(), 0 flushes after every commit.
+        :param profile: (str) name of a performance profile in PROFILES, or (dict) pragma names and values
+        '''
+        if in_memory and pool_size:
+            raise ValueError("in_memory cannot be combined with pool_size, as pooled readers read the database file")
+
         self.db_path = db_path
-        self.connection = sqlite3.connect(db_path)
+        self.pool_size = pool_size
+        self._lock = threading.RLock()
+        self._transaction_owner = None
+        self._disk = None
+        self._flush_interval = flush_interval
+        self._unflushed = False
+        self._flush_stop = None
+        self.pragmas = _profile_pragmas(profile)
+
+        if in_memory:
+            # check_same_thread=False, as the background flush runs on its own thread (under the interface lock)
+            self._disk = sqlite3.connect(db_path,check_same_thread=False)
+            self.connection = sqlite3.connect(':memory:',cached_statements=statement_cache_size,
+                                              check_same_thread=False)
+            _apply_pragmas(self._disk,self.pragmas)
+            self._disk.backup(self.connection)
+            _apply_pragmas(self.connection,self.pragmas,_CONNECTION_PRAGMAS)
+            self._readers = None
+        elif pool_size:
+            self.connection = sqlite3.connect(db_path,cached_statements=statement_cache_size,check_same_thread=False)
+            _apply_pragmas(self.connection,self.pragmas,[name for name in _PRAGMAS if name != 'journal_mode'])
+            self.connection.execute("pragma journal_mode=WAL;")
+            self._readers = queue.LifoQueue()
+            self._all_readers = []
+            self._overflow_readers = set()
+            self._held_readers = {}
+            self._stream_readers = 0
+            self._pool_lock = threading.Lock()
+            self._schema_reader = None
+            self._schema_lock = threading.Lock()
+        else:
+            self.connection = sqlite3.connect(db_path,cached_statements=statement_cache_size)
+            _apply_pragmas(self.connection,self.pragmas)
+            self._readers = None
         self.cursor = self.connection.cursor()
 
-        self._get_fields()
+        self._statement_lock = threading.Lock()
+        self._statements = OrderedDict()
+        self._statement_cache_size = statement_cache_size
+        self._statement_hits = 0
+        self._statement_misses = 0
 
-    def _get_fields(self):
+        self._transaction_depth = 0
+        self._commit_every = None
+        self._pending_commits = 0
 
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        info = self.cursor.fetchall()
-        self.tables = []
-        for e in info:
-            self.tables.append(e[0])
+        self._diagnostics = None
+        self._diagnostics_lock = threading.Lock()
+
+        self._result_cache = None
+        self._dirty_tables = set()
 
-        self.field_info = {}
-        self.fields = {}
-        self.primary_key = {}
-        for table in self.tables:
-            self.cursor.execute(f"pragma table_info([{table}])")
-            info = self.cursor.fetchall()
+        # table metadata is loaded on first use and reloaded only when the schema version changes. It is shared
+        # between interfaces on the same file, but private for in-memory/temporary databases and working copies.
+        if db_path in (':memory:','') or in_memory:
+            self._schema_cache = {}
+        else:
+            self._schema_cache = _schema_cache
+        self._schema_key = os.path.abspath(db_path)
+        self.fields = _SchemaMapping(self,'fields')
+        self.field_info = _SchemaMapping(self,'field_info')
+        self.primary_key = _SchemaMapping(self,'primary_key')
+
+        if in_memory and flush_interval:
+            self._flush_stop = threading.Event()
+            self._flusher = threading.Thread(target=self._flush_periodically,args=(flush_interval,),daemon=True,
+                                             name='sqlite-flush')
+            self._flusher.start()
+
+    @property
+    def tables(self):
+        '''
+        Names of the tables in the database.
+
+        :return: list(str)
+        '''
+
+        with self._schema_connection() as connection:
+            schema = self._schema(connection)
+            tables = schema['tables']
+            if tables is None:
+                info = connection.execute("SELECT name FROM sqlite_master WHERE type='table';").fetchall()
+                tables = [e[0] for e in info]
+                schema['tables'] = tables
+        # a copy, as the cached list is shared by every interface open on the file
+        return list(tables)
+
+    @contextmanager
+    def _schema_connection(self):
+
+        # schema lookups never wait on the reader pool, as the caller may itself be holding pooled readers (e.g. for an
+        # open query_iter stream). In pooled mode they get a connection of their own, except that a thread inside a
+        # transaction uses the writer to see its own uncommitted DDL.
+        if self._readers is None or self._transaction_owner == threading.get_ident():
+            with self._lock:
+                yield self.connection
+            return
+        with self._schema_lock:
+            if self._schema_reader is None:
+                self._schema_reader = self._connect_reader()
+            yield self._schema_reader
+
+    def _schema(self,connection):
+
+        version = connection.execute("pragma schema_version;").fetchone()[0]
+
+        with _schema_cache_lock:
+            schema = self._schema_cache.get(self._schema_key)
+            if schema is None or schema['version'] != version:
+                schema = {'version':version,'tables':None,'table_info':{}}
+                self._schema_cache[self._schema_key] = schema
+        return schema
+
+    def _table_schema(self,table):
+
+        # public methods call this once and use the returned dict, so the schema version is checked once per call
+        with self._schema_connection() as connection:
+            schema = self._schema(connection)
+            table_info = schema['table_info'].get(table)
+            if table_info is not None:
+                return table_info
+            info = connection.execute(f"pragma table_info([{table}])").fetchall()
+        if not info:
+            raise KeyError(table)
 
-            self.field_info[table] = {}
-            self.fields[table] = []
-            for e in info:
-                self.fields[table].append(e[1])
-                self.field_info[table][e[1]] = {'idx':e[0],'type':e[2],'not_null':e[3]}
-                if e[5] == 1:
-                    self.primary_key[table] = e[1]
+        table_info = {'fields':[],'field_info':{}}
+        for e in info:
+            table_info['fields'].append(e[1])
+            table_info['field_info'][e[1]] = {'idx':e[0],'type':e[2],'not_null':e[3]}
+            if e[5] == 1:
+                table_info['primary_key'] = e[1]
+        schema['table_info'][table] = table_info
+        return table_info
 
 
     def close(self):
@@ -40,12 +512,136 @@ class SqliteInterface:
         :return:
         '''
 
+        if self._readers is not None:
+            with self._pool_lock:
+                for connection in self._all_readers:
+                    connection.close()
+                self._all_readers = []
+            with self._schema_lock:
+                if self._schema_reader is not None:
+                    self._schema_reader.close()
+                    self._schema_reader = None
+        if self._disk is not None:
+            if self._flush_stop is not None:
+                self._flush_stop.set()
+                self._flusher.join()
+            with self._lock:
+                # changes left uncommitted outside a transaction block are discarded, as they would be on disk
+                if not self._transaction_depth and self.connection.in_transaction:
+                    self._end_transaction(commit=False)
+            self.flush()
+            self._disk.close()
         self.cursor.close()
         self.connection.close()
 
+    def flush(self):
+        '''
+        Copy the committed state of the in-memory working copy back to the database file (see in_memory). Does nothing
+        if there are no changes since the last flush, or if called from inside a transaction block (the changes are
+        flushed once committed).
+
+        Example usage:
+            db = SqliteInterface('../data/shop.db',in_memory=True)
+            db.update_fields(table="items", update={"price": 5.0}, query='name=?', params=('Basketball',))
+            db.flush()
+
+        :return: (bool) True if the database file was written
+        '''
+
+        if self._disk is None:
+            return False
+        with self._lock:
+            # a backup taken inside a transaction would copy its uncommitted changes
+            if not self._unflushed or self._transaction_depth or self.connection.in_transaction:
+                return False
+            self.connection.backup(self._disk)
+            self._unflushed = False
+        return True
+
+    def _flush_periodically(self,interval):
+
+        while not self._flush_stop.wait(interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                # e.g. the file is locked by another connection: the changes stay unflushed, and are retried next time
+                warnings.warn(f"could not flush the in-memory copy of {self.db_path}: {e}",RuntimeWarning)
+
+    @contextmanager
+    def _read_connection(self):
+
+        if self._readers is None or self._transaction_owner == threading.get_ident():
+            with self._lock:
+                yield self.connection
+            return
+
+        connection,ident = self._acquire_reader()
+        try:
+            yield connection
+        finally:
+            self._release_reader(connection,ident)
+
+    def _acquire_reader(self,stream=False):
+
+        # stream: the reader is held by a query_iter stream until it is exhausted or closed, which (e.g. for an async
+        # stream, resumed on any worker thread) may only happen after other reads. Other readers are only held for the
+        # duration of a call, on the thread that made it.
+        ident = None if stream else threading.get_ident()
+        connection = None
+        while connection is None:
+            try:
+                connection = self._readers.get_nowait()
+            except queue.Empty:
+                with self._pool_lock:
+                    if len(self._all_readers) < self.pool_size:
+                        connection = self._connect_reader()
+                        self._all_readers.append(connection)
+                    elif self._held_readers.get(ident) or self._stream_readers >= len(self._all_readers):
+                        # this thread already holds a reader, or every reader is held by an open stream, so waiting
+                        # for one to be returned could wait forever: use a temporary extra connection instead
+                        connection = self._connect_reader()
+                        self._overflow_readers.add(connection)
+                if connection is None:
+                    try:
+                        connection = self._readers.get(timeout=0.1)
+                    except queue.Empty:
+                        # check again whether the readers have since been taken by streams
+                        pass
+        with self._pool_lock:
+            if stream:
+                if connection not in self._overflow_readers:
+                    self._stream_readers += 1
+            else:
+                self._held_readers[ident] = self._held_readers.get(ident,0) + 1
+        return connection,ident
+
+    def _release_reader(self,connection,ident):
+
+        with self._pool_lock:
+            overflow = connection in self._overflow_readers
+            self._overflow_readers.discard(connection)
+            if ident is None:
+                if not overflow:
+                    self._stream_readers -= 1
+            else:
+                self._held_readers[ident] -= 1
+                if not self._held_readers[ident]:
+                    del self._held_readers[ident]
+        if overflow:
+            connection.close()
+        else:
+            self._readers.put(connection)
+
+    def _connect_reader(self):
+
+        connection = sqlite3.connect(_read_only_uri(self.db_path),uri=True,check_same_thread=False,
+                                     cached_statements=self._statement_cache_size)
+        _apply_pragmas(connection,self.pragmas,_CONNECTION_PRAGMAS)
+        return connection
+
     def insert_row(self,entry,table,field_map):
         '''
-        Insert a single row (via json) into the database.
+        Insert a single row (via json) into the database. Values are bound as parameters.
 
         If field from database is not in entry, it will not assign anything to it (and it will get the default or null
         value from database, or trigger an error if the field has a NOT NULL constraint)
@@ -59,23 +655,296 @@ class SqliteInterface:
         :return:
         '''
 
-        record = ''
+        values = []
         available_fields = []
         for field in self.fields[table]:
             if field_map[field] in entry.keys():
-                f = entry[field_map[field]]
-                if type(f) == str:
-                    record = record + f'\"{f}\",'
-                else:
-                    record = record + f'{f},'
+                values.append(entry[field_map[field]])
                 available_fields.append(field)
-        record = record.rsplit(',',1)[0]
 
-        self.cursor.execute(f"insert into {table} ({','.join(available_fields)}) values({record});")
-        self.connection.commit()
+        with self._lock:
+            self._execute_write(self._insert_command(table,available_fields),values,table)
+
+
+    @contextmanager
+    def transaction(self,commit_every=None):
+        '''
+        Group mutations into a single transaction.
+
+        Mutating methods (insert_row, insert_rows, update_fields, delete_rows, clear_table, delete_table and
+        sql_command with modify_db=True) normally commit on every call. Inside this block their commits are deferred,
+        and a single commit is made on exit. If an exception is raised inside the block, all uncommitted changes are
+        rolled back, including DDL such as delete_table or create_index. Nested blocks join the outermost transaction.
+        In pooled mode, the block holds the write lock, so other threads' writes wait until it exits.
+
+        Example usage:
+            with db.transaction():
+                db.update_fields(table="items", update={"price": 5.0}, query='name=?', params=("Basketball",))
+                db.delete_rows(table="items", query='stocked=0')
+        - commit every 1000 mutating calls (and once more on exit)
+            with db.transaction(commit_every=1000):
+                ...
+
+        :param commit_every: (int) if set, commit after this many mutating calls rather than only on exit
+        '''
+
+        with self._lock:
+            outermost = self._transaction_depth == 0
+            if outermost:
+                self._commit_every = commit_every
+                self._pending_commits = 0
+                self._transaction_owner = threading.get_ident()
+                self._begin()
+            self._transaction_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._transaction_depth -= 1
+                if outermost:
+                    self._transaction_owner = None
+                    self._end_transaction(commit=False)
+                raise
+            else:
+                self._transaction_depth -= 1
+                if outermost:
+                    self._transaction_owner = None
+                    self._end_transaction(commit=True)
+
+    def autocommit_every(self,n):
+        '''
+        Defer commits so that mutations are committed once every n mutating calls (and once more on exit).
+
+        Example usage:
+            with db.autocommit_every(1000):
+                for name,price in feed:
+                    db.update_fields(table="items", update={"price": price}, query='name=?', params=(name,))
+
+        :param n: (int) number of mutating calls per commit
+        '''
+
+        return self.transaction(commit_every=n)
+
+    def _commit(self,table=None):
+
+        # table: the table that was modified (None if unknown), so its cached query results can be invalidated
+        self._invalidate(table)
+        if self._transaction_depth:
+            self._pending_commits += 1
+            if self._commit_every and self._pending_commits >= self._commit_every:
+                self._end_transaction(commit=True)
+                self._pending_commits = 0
+                self._begin()
+        else:
+            self._end_transaction(commit=True)
+
+    def _begin(self):
+
+        # sqlite3 only opens a transaction implicitly before DML, so without an explicit begin, DDL (drop table,
+        # create index, ...) inside a transaction block would be committed straight away and not rolled back
+        if not self.connection.in_transaction:
+            self.connection.execute("begin;")
+
+    def _rollback(self):
 
+        # inside a transaction block the rollback is left to the block, so earlier work is not silently dropped
+        if not self._transaction_depth:
+            self._end_transaction(commit=False)
 
-    def query(self,table,display_fields=None,query=None,output_json=False):
+    def _execute_write(self,command,params=(),table=None):
+
+        # a failed statement leaves sqlite3's implicit transaction open, which would otherwise hold the write lock and
+        # block flushes of the in-memory copy until the next successful commit
+        try:
+            self.cursor.execute(command,params)
+            self._commit(table)
+        except Exception:
+            self._rollback()
+            raise
+
+    def _invalidate(self,table):
+
+        if self._result_cache is not None:
+            self._result_cache.invalidate(table)
+        self._dirty_tables.add(table)
+
+    def _end_transaction(self,commit):
+
+        # invalidate again once the changes are committed (or rolled back), as results may have been cached from
+        # another connection's view of the old data, or from this connection's uncommitted data, in the meantime
+        try:
+            if commit:
+                self.connection.commit()
+                if self._disk is not None:
+                    self._unflushed = True
+                    if self._flush_interval == 0:
+                        self.flush()
+            else:
+                self.connection.rollback()
+        finally:
+            if not commit:
+                # the shared schema entry may describe rolled back DDL, under a version number that the next committed
+                # schema change will reuse
+                with _schema_cache_lock:
+                    self._schema_cache.pop(self._schema_key,None)
+            if self._result_cache is not None:
+                for table in self._dirty_tables:
+                    self._result_cache.invalidate(table)
+            self._dirty_tables.clear()
+
+    def insert_rows(self,entries,table,field_map,batch_size=10000):
+        '''
+        Insert many rows (via json) into the database in batches.
+
+        Much faster than calling insert_row in a loop: the field map is resolved once, values are bound as parameters
+        with executemany, and the database is committed once per batch rather than once per row. entries may be any
+        iterable (including a generator), so the full dataset never needs to be in memory.
+
+        Every db-field in field_map is written for every row. If an entry is missing a json-field, NULL is inserted for
+        it (unlike insert_row, which leaves the field to its default value).
+
+        Example usage:
+            stats = db.insert_rows(entries=data,table="items",field_map={"name":"name","price":"cost"})
+        - stream rows from a generator, committing every 50000 rows
+            stats = db.insert_rows(entries=(json.loads(l) for l in f),table="items",field_map=field_map,batch_size=50000)
+
+        :param entries: iterable of json's where keys should be in json-field.
+        :param table: name of the table to insert into.
+        :param field_map: e.g. {'a':'a','b':'c'}. db-field:json-field
+        :param batch_size: (int) number of rows bound and committed per batch (commits are deferred inside a transaction block).
+        :return: (dict) throughput stats: {'rows':..,'batches':..,'elapsed':.. (seconds),'rows_per_sec':..}
+        '''
+
+        db_fields = [field for field in self.fields[table] if field in field_map]
+        json_fields = [field_map[field] for field in db_fields]
+        command = self._insert_command(table,db_fields)
+
+        rows = (tuple(entry.get(f) for f in json_fields) for entry in entries)
+
+        return self._execute_batches(table,rows,batch_size,lambda batch: [(command,batch)])
+
+    def upsert_rows(self,entries,table,field_map,batch_size=10000,key_field=None):
+        '''
+        Insert many rows (via json), updating the existing row instead wherever the key already exists
+        (insert ... on conflict(key) do update).
+
+        Rows are bound in batches of batch_size with executemany, inside a single transaction. As with insert_rows,
+        every db-field in field_map is written for every row, and entries can be any iterable (including a generator).
+
+        Example usage:
+        - sync a price feed, inserting new items and updating the price of existing ones
+            stats = db.upsert_rows(entries=feed,table="items",field_map={"name":"name","category":"category","price":"cost","stocked":"stocked"})
+
+        :param entries: iterable of json's where keys should be in json-field.
+        :param table: name of the table to insert into.
+        :param field_map: e.g. {'a':'a','b':'c'}. db-field:json-field. Must include the key field.
+        :param batch_size: (int) number of rows bound per executemany.
+        :param key_field: (str) field with a unique constraint to detect conflicts on. Default None uses the table's primary key.
+        :return: (dict) throughput stats: {'rows':..,'changed':.. (rows inserted or updated),'batches':..,'elapsed':.. (seconds),'rows_per_sec':..}
+        '''
+
+        info = self._table_schema(table)
+        if key_field is None:
+            key_field = info.get('primary_key')
+            if key_field is None:
+                raise ValueError(f"table '{table}' has no primary key, so key_field is required")
+        if key_field not in field_map:
+            raise ValueError(f"field_map must include the key field '{key_field}'")
+
+        db_fields = [field for field in info['fields'] if field in field_map]
+        json_fields = [field_map[field] for field in db_fields]
+        update_fields = [field for field in db_fields if field != key_field]
+
+        def build():
+            if update_fields:
+                action = 'do update set ' + ','.join(f'{field}=excluded.{field}' for field in update_fields)
+            else:
+                action = 'do nothing'
+            return (f"insert into {table} ({','.join(db_fields)}) values({','.join('?'*len(db_fields))}) "
+                    f"on conflict({key_field}) {action};")
+
+        command = self._statement(('upsert',table,tuple(db_fields),key_field),build)
+        rows = (tuple(entry.get(f) for f in json_fields) for entry in entries)
+
+        with self.transaction():
+            return self._execute_batches(table,rows,batch_size,lambda batch: [(command,batch)])
+
+    def update_rows_by_key(self,table,updates,batch_size=10000,key_field=None):
+        '''
+        Update specific fields of many rows, each identified by its key.
+
+        Updates are bound in batches of batch_size with executemany (one statement per distinct set of updated fields),
+        inside a single transaction. Keys which do not exist, and empty updates, are ignored.
+
+        Example usage:
+        - update prices (and stock) by item name
+            stats = db.update_rows_by_key(table="items",updates={"Football":{"price":45.0},"Basketball":{"price":25.0,"stocked":1}})
+        - stream (key, update) pairs
+            stats = db.update_rows_by_key(table="items",updates=((name,{"price":price}) for name,price in feed))
+
+        :param table: (str)
+        :param updates: dictionary of dictionaries (key as key, {field:value} as value), or an iterable of (key, dictionary) pairs
+        :param batch_size: (int) number of updates bound per batch.
+        :param key_field: (str) field identifying the rows. Default None uses the table's primary key.
+        :return: (dict) throughput stats: {'rows':..,'changed':.. (rows updated),'batches':..,'elapsed':.. (seconds),'rows_per_sec':..}
+        '''
+
+        if key_field is None:
+            key_field = self._table_schema(table).get('primary_key')
+            if key_field is None:
+                raise ValueError(f"table '{table}' has no primary key, so key_field is required")
+        if isinstance(updates,Mapping):
+            updates = updates.items()
+
+        def statements(batch):
+            groups = {}
+            for key,update in batch:
+                if not update:
+                    # nothing to set (and "update .. set where .." is not valid sql)
+                    continue
+                fields = tuple(update.keys())
+                groups.setdefault(fields,[]).append(tuple(update.values()) + (key,))
+
+            for fields,rows in groups.items():
+                def build():
+                    update_str = ','.join(f'{field}=?' for field in fields)
+                    return f"update {table} set {update_str} where {key_field}=?;"
+
+                yield self._statement(('update_by_key',table,fields,key_field),build),rows
+
+        with self.transaction():
+            return self._execute_batches(table,updates,batch_size,statements)
+
+    def _execute_batches(self,table,items,batch_size,statements):
+
+        # statements(batch) returns the (command, rows) pairs to executemany for a batch of items
+        num_rows = 0
+        num_changed = 0
+        num_batches = 0
+        items = iter(items)
+        start = time.perf_counter()
+        with self._lock:
+            while True:
+                batch = list(islice(items,batch_size))
+                if not batch:
+                    break
+                try:
+                    for command,rows in statements(batch):
+                        self.cursor.executemany(command,rows)
+                        num_changed += self.cursor.rowcount
+                    self._commit(table)
+                except Exception:
+                    self._rollback()
+                    raise
+                num_rows += len(batch)
+                num_batches += 1
+        elapsed = time.perf_counter() - start
+
+        return {'rows':num_rows,'changed':num_changed,'batches':num_batches,'elapsed':elapsed,
+                'rows_per_sec':num_rows/elapsed if elapsed > 0 else float('inf')}
+
+
+    def query(self,table,display_fields=None,query=None,output_json=False,params=None,output=None,batch_size=10000,
+              compact_rows=False):
         '''
         Query a database table with an expression and return selective fields for each query.
 
@@ -92,32 +961,63 @@ class SqliteInterface:
             queries = db.query(table='items',display_fields=('name','category'),query='(category="Sporting Goods")&(price>30)')
         - display all data in the database
             queries = db.query(table='items')
-
+        - bind values to ? placeholders in the query (the statement is reused for different values)
+            queries = db.query(table='items',display_fields=('name','price'),query='category=? and price<?',params=('Sporting Goods',50))
+        - return columns instead of rows, e.g. {'price':array('d',[...]),'stocked':array('q',[...])}
+            columns = db.query(table='items',display_fields=('price','stocked'),output='columns')
+        - return a dictionary of numpy arrays, or a numpy structured array
+            columns = db.query(table='items',display_fields=('price','stocked'),output='numpy')
+            records = db.query(table='items',output='structured')
+        - compact Row objects (keyed by primary key), used as dictionaries or through attributes
+            queries = db.query(table='items',output_json=True,compact_rows=True)
+            queries['Football']['price'] == queries['Football'].price
 
         :param table: (str) name of table
         :param display_fields: tuple(str) column names to output for each returned query e.g. ('name','place'). If None, returns all columns.
         :param query: (str) query expression to perform e.g. 'height<5'
         :param output_json: (bool) True: returns a dictionary of dictionaries (primary key as key) instead of a list of tuples.
+        :param params: tuple values bound to ? placeholders in query
+        :param output: (str) None: rows (see output_json). 'columns': dictionary of columns (field name as key), filled
+            directly from batched fetches. Numeric columns are typed arrays (array.array), other columns (and numeric
+            columns containing NULLs) are lists. 'numpy': dictionary of numpy arrays typed from the declared column types
+            (int64, float64, or object; numeric columns containing NULLs become float64, with NULL as NaN). 'structured': numpy structured array with one field per column.
+            numpy is only required for the last two.
+        :param batch_size: (int) only relevant if output is set - number of rows fetched from the database at a time
+        :param compact_rows: (bool) True: rows are returned as Row objects (which can also be used as dictionaries)
+            instead of tuples, or instead of dictionaries with output_json.
         :return: list of tuples
         '''
-        if display_fields:
-            display_str = ','.join(display_fields)
-        else:
-            display_str = '*'
+        if self._result_cache is not None:
+            key = ('query',table,tuple(display_fields) if display_fields else None,query.strip() if query else None,
+                   _params_key(params),bool(output_json),output,bool(compact_rows))
+            return self._cached(key,table,lambda: self._query(table,display_fields,query,output_json,params,output,
+                                                              batch_size,compact_rows))
+        return self._query(table,display_fields,query,output_json,params,output,batch_size,compact_rows)
 
-        if query is None:
-            self.cursor.execute( f"select {display_str} from {table};" )
-        else:
-            self.cursor.execute(f"select {display_str} from {table} where {query};")
+    def _query(self,table,display_fields,query,output_json,params,output,batch_size,compact_rows=False):
 
+        if output is not None:
+            return self._query_columns(table,display_fields,query,params,output,batch_size)
 
-        data = self.cursor.fetchall()
+        command = self._select_command(table,display_fields,query)
+        with self._read_connection() as connection:
+            self._diagnose(connection,command,params,table,query)
+            cursor = connection.cursor()
+            try:
+                if compact_rows:
+                    cursor.row_factory = Row
+                data = cursor.execute(command,params or ()).fetchall()
+            finally:
+                cursor.close()
 
         if output_json:
+            info = self._table_schema(table)
             if not display_fields:
-                display_fields = self.fields[table]
+                display_fields = info['fields']
+            key_idx = display_fields.index(info.get('primary_key'))
+            if compact_rows:
+                return {row[key_idx]:row for row in data}
             data_dict = {}
-            key_idx = display_fields.index(self.primary_key[table])
             for row in data:
                 data_dict[row[key_idx]] = {}
                 for i,field in enumerate(display_fields):
@@ -128,6 +1028,356 @@ class SqliteInterface:
         return data
 
 
+    def _query_columns(self,table,display_fields,query,params,output,batch_size):
+
+        if output not in ('columns','numpy','structured'):
+            raise ValueError(f"output must be one of 'columns', 'numpy' or 'structured', not {output!r}")
+        if output != 'columns':
+            try:
+                import numpy as np
+            except ImportError:
+                raise ImportError(f"output='{output}' requires numpy (pip install numpy)") from None
+
+        info = self._table_schema(table)
+        fields = list(display_fields) if display_fields else list(info['fields'])
+        field_info = info['field_info']
+
+        # typed arrays for numeric columns, lists for everything else. A numeric column only becomes a list if a NULL
+        # (or a value that does not fit the declared type) actually turns up
+        typecodes = [_column_typecode(field_info.get(field)) for field in fields]
+        columns = [array(code) if code else [] for code in typecodes]
+
+        command = self._select_command(table,display_fields,query)
+        with self._read_connection() as connection:
+            self._diagnose(connection,command,params,table,query)
+            cursor = connection.execute(command,params or ())
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for i in range(len(fields)):
+                        size = len(columns[i])
+                        try:
+                            columns[i].extend(map(itemgetter(i),rows))
+                        except TypeError:
+                            # a NULL, or a value that does not fit the declared type (sqlite is dynamically typed)
+                            columns[i] = list(columns[i][:size])
+                            columns[i].extend(map(itemgetter(i),rows))
+            finally:
+                cursor.close()
+
+        if output == 'columns':
+            return dict(zip(fields,columns))
+
+        dtypes = {'q':np.int64,'d':np.float64}
+        arrays = {}
+        for field,column,code in zip(fields,columns,typecodes):
+            if isinstance(column,array):
+                arrays[field] = np.frombuffer(column,dtype=dtypes[code])
+                continue
+            if code and all(value is None or isinstance(value,(int,float)) for value in column):
+                # numeric column with NULLs: NULL -> NaN
+                arrays[field] = np.array(column,dtype=np.float64)
+                continue
+            arrays[field] = np.empty(len(column),dtype=object)
+            arrays[field][:] = column
+
+        if output == 'numpy':
+            return arrays
+
+        num_rows = len(arrays[fields[0]]) if fields else 0
+        records = np.empty(num_rows,dtype=[(field,arrays[field].dtype) for field in fields])
+        for field in fields:
+            records[field] = arrays[field]
+        return records
+
+    def query_page(self,table,display_fields=None,query=None,params=None,after=None,page_size=100,order_field=None,
+                   output_json=False):
+        '''
+        Return one page of a query, using keyset pagination: rows are ordered by order_field (default the primary key),
+        and each page continues from the key of the last row of the previous page. Unlike appending LIMIT/OFFSET to the
+        query, every page costs the same however deep it is (as long as order_field is indexed).
+
+        If order_field is not the primary key, the primary key is used to break ties. order_field may contain NULLs,
+        which (as in sqlite's order by) come first. Tables without a primary key are paged by rowid.
+
+        Example usage:
+        - first page of 50 items
+            rows,token = db.query_page(table='items',display_fields=('name','price'),page_size=50)
+        - next page (token is None after the last page)
+            rows,token = db.query_page(table='items',display_fields=('name','price'),page_size=50,after=token)
+        - page through sporting goods in order of price
+            rows,token = db.query_page(table='items',query='category=?',params=('Sporting Goods',),order_field='price',after=token)
+
+        :param table: (str) name of table
+        :param display_fields: tuple(str) column names to output for each returned query e.g. ('name','place'). If None, returns all columns.
+        :param query: (str) query expression to perform e.g. 'height<5'
+        :param params: tuple values bound to ? placeholders in query
+        :param after: (str) continuation token returned with the previous page. Default None returns the first page.
+        :param page_size: (int) maximum number of rows per page
+        :param order_field: (str) field to order and page by. Default None uses the primary key.
+        :param output_json: (bool) True: returns a dictionary of dictionaries (primary key as key) instead of a list of tuples.
+        :return: (rows, token) - rows as in query, and the continuation token for the next page (None if this is the last page)
+        '''
+
+        info = self._table_schema(table)
+        key = info.get('primary_key') or 'rowid'
+        keys = [order_field] if order_field and order_field != key else []
+        keys.append(key)
+
+        fields = list(display_fields) if display_fields else list(info['fields'])
+        select_fields = fields + [k for k in keys if k not in fields]
+        key_idx = [select_fields.index(k) for k in keys]
+
+        previous = _decode_page_token(after) if after is not None else None
+        # a row value comparison is never true against a NULL, so a page ending on a NULL order_field continues with
+        # the rest of the NULLs (by key), then every non-NULL value
+        after_null = previous is not None and len(keys) > 1 and previous[0] is None
+
+        def build():
+            conditions = []
+            if query:
+                conditions.append(f"({query})")
+            if after_null:
+                conditions.append(f"(({keys[0]} is null and {key} > ?) or {keys[0]} is not null)")
+            elif after is not None:
+                conditions.append(f"({','.join(keys)}) > ({','.join('?'*len(keys))})")
+            where_str = f" where {' and '.join(conditions)}" if conditions else ''
+            return f"select {','.join(select_fields)} from {table}{where_str} order by {','.join(keys)} limit ?;"
+
+        command = self._statement(('page',table,tuple(select_fields),query,tuple(keys),after is not None,after_null),
+                                  build)
+        values = _params_key(params)
+        if after_null:
+            values += (previous[1],)
+        elif after is not None:
+            values += tuple(previous)
+        with self._read_connection() as connection:
+            self._diagnose(connection,command,values + (page_size + 1,),table,query)
+            rows = connection.execute(command,values + (page_size + 1,)).fetchall()
+
+        token = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            token = _encode_page_token([last[i] for i in key_idx])
+
+        if output_json:
+            idx = select_fields.index(key)
+            return {row[idx]:dict(zip(fields,row)) for row in rows},token
+
+        if len(select_fields) > len(fields):
+            rows = [row[:len(fields)] for row in rows]
+
+        return rows,token
+
+    def parallel_query(self,table,display_fields=None,query=None,params=None,workers=None,partitions=None,
+                       executor='thread'):
+        '''
+        Query a table by splitting it into rowid ranges which are read in parallel, each on its own read-only
+        connection, and merging the results in rowid order (the order of a full table scan).
+
+        With executor='thread' the partitions are read by a thread pool (sqlite releases the GIL while stepping through
+        rows, but decoding them into python objects does not). With executor='process' they are read by a process pool,
+        which also parallelises decoding, at the cost of sending the rows back between processes.
+
+        Only committed data is read, and the table must have a rowid (i.e. not be a WITHOUT ROWID table). The database
+        cannot be in-memory.
+
+        Example usage:
+        - read the whole items table with 8 processes
+            queries = db.parallel_query(table='items',workers=8,executor='process')
+        - read the names and prices of sporting goods with 4 threads
+            queries = db.parallel_query(table='items',display_fields=('name','price'),query='category=?',params=('Sporting Goods',),workers=4)
+
+        :param table: (str) name of table
+        :param display_fields: tuple(str) column names to output for each returned query e.g. ('name','place'). If None, returns all columns.
+        :param query: (str) query expression to perform e.g. 'height<5'
+        :param params: tuple values bound to ? placeholders in query
+        :param workers: (int) number of threads or processes. Default None uses the number of cpus.
+        :param partitions: (int) number of rowid ranges to split the table into. Default None uses 4 per worker.
+        :param executor: (str) 'thread' or 'process'
+        :return: list of tuples
+        '''
+
+        data = []
+        for _,rows in self._read_partitions(table,display_fields,query,params,workers,partitions,executor,True):
+            data.extend(rows)
+        return data
+
+    def parallel_query_iter(self,table,display_fields=None,query=None,params=None,workers=None,partitions=None,
+                            executor='thread'):
+        '''
+        Unordered, streamed version of parallel_query: rows are yielded partition by partition, as soon as each
+        partition has been read (so in no particular order).
+
+        Example usage:
+            for row in db.parallel_query_iter(table='items',workers=8,executor='process'):
+                ...
+
+        :return: generator of tuples
+        '''
+
+        for _,rows in self._read_partitions(table,display_fields,query,params,workers,partitions,executor,False):
+            yield from rows
+
+    def _read_partitions(self,table,display_fields,query,params,workers,partitions,executor,ordered):
+
+        if executor not in ('thread','process'):
+            raise ValueError(f"executor must be 'thread' or 'process', not {executor!r}")
+        if self.db_path in (':memory:','') or self._disk is not None:
+            raise ValueError("parallel queries need a database file, not an in-memory database")
+
+        workers = workers or os.cpu_count() or 1
+        partitions = partitions or workers * 4
+        with self._read_connection() as connection:
+            low,high = connection.execute(f"select min(rowid),max(rowid) from {table};").fetchone()
+        if low is None:
+            return
+
+        predicate = f"({query}) and rowid between ? and ?" if query else "rowid between ? and ?"
+        command = self._select_command(table,display_fields,predicate)
+        if ordered:
+            command = command[:-1] + " order by rowid;"
+
+        step = max(1,-(-(high - low + 1) // partitions))
+        ranges = [(start,min(start + step - 1,high)) for start in range(low,high + 1,step)]
+
+        pool_type = ThreadPoolExecutor if executor == 'thread' else ProcessPoolExecutor
+        with pool_type(max_workers=workers) as pool:
+            futures = {pool.submit(_read_partition,self.db_path,command,tuple(params or ()) + bounds):i
+                       for i,bounds in enumerate(ranges)}
+            if ordered:
+                # yield in rowid order, as each partition (and all those before it) are ready
+                for future in futures:
+                    yield futures[future],future.result()
+            else:
+                for future in as_completed(futures):
+                    yield futures[future],future.result()
+
+    def query_iter(self,table,display_fields=None,query=None,batch_size=1000,output_json=False,params=None,
+                   compact_rows=False):
+        '''
+        Stream the results of a query, rather than returning them all at once.
+
+        Takes the same table, display_fields and query arguments as query, but rows are fetched lazily in batches of
+        batch_size on a dedicated cursor, so memory stays flat regardless of table size and other methods can be used
+        on the interface while the stream is open.
+
+        Example usage:
+        - stream all item names and prices
+            for name,price in db.query_iter(table='items',display_fields=('name','price')):
+                ...
+        - stream rows as (primary key, row dict) pairs
+            for key,row in db.query_iter(table='items',query='price<50',output_json=True):
+                ...
+        - dict(db.query_iter(table='items',output_json=True)) is equivalent to db.query(table='items',output_json=True)
+
+        :param table: (str) name of table
+        :param display_fields: tuple(str) column names to output for each returned query e.g. ('name','place'). If None, returns all columns.
+        :param query: (str) query expression to perform e.g. 'height<5'
+        :param batch_size: (int) number of rows fetched from the database at a time
+        :param output_json: (bool) True: yields (primary key, dictionary) pairs instead of tuples.
+        :param params: tuple values bound to ? placeholders in query
+        :param compact_rows: (bool) True: rows are yielded as Row objects instead of tuples (or dictionaries)
+        :return: generator of tuples
+        '''
+
+        if output_json:
+            info = self._table_schema(table)
+            if not display_fields:
+                display_fields = info['fields']
+            key_idx = display_fields.index(info.get('primary_key'))
+
+        command = self._select_command(table,display_fields,query)
+        reader = None
+        if self._readers is None:
+            connection = self.connection
+        elif self._transaction_owner == threading.get_ident():
+            # read this thread's own uncommitted changes
+            connection = self.connection
+        else:
+            # hold a pooled reader for the lifetime of the stream
+            connection,ident = self._acquire_reader(stream=True)
+            reader = connection
+
+        cursor = connection.cursor()
+        if compact_rows:
+            cursor.row_factory = Row
+        try:
+            self._diagnose(connection,command,params,table,query)
+            cursor.execute(command,params or ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    if output_json:
+                        yield row[key_idx], row if compact_rows else dict(zip(display_fields,row))
+                    else:
+                        yield row
+        finally:
+            cursor.close()
+            if reader is not None:
+                self._release_reader(reader,ident)
+
+    def statement_cache_info(self):
+        '''
+        Hit/miss counters for the memoized statement text.
+
+        Statements with the same (table, fields, predicate) shape are generated once and reused, so sqlite3 finds
+        the already compiled statement in its own cache instead of parsing and planning it again. Use ? placeholders
+        and params (rather than inlining values in the query string) so repeated calls share the same shape.
+
+        Example usage:
+            info = db.statement_cache_info()
+
+        :return: (dict) {'hits':..,'misses':..,'size':..,'max_size':..}
+        '''
+
+        return {'hits':self._statement_hits,'misses':self._statement_misses,'size':len(self._statements),
+                'max_size':self._statement_cache_size}
+
+    def _statement(self,key,build):
+
+        with self._statement_lock:
+            command = self._statements.get(key)
+            if command is None:
+                self._statement_misses += 1
+                command = build()
+                self._statements[key] = command
+                if len(self._statements) > self._statement_cache_size:
+                    self._statements.popitem(last=False)
+            else:
+                self._statement_hits += 1
+                self._statements.move_to_end(key)
+            return command
+
+    def _select_command(self,table,display_fields=None,query=None):
+
+        def build():
+            if display_fields:
+                display_str = ','.join(display_fields)
+            else:
+                display_str = '*'
+
+            if query is None:
+                return f"select {display_str} from {table};"
+            else:
+                return f"select {display_str} from {table} where {query};"
+
+        fields = tuple(display_fields) if display_fields else None
+        return self._statement(('select',table,fields,query),build)
+
+    def _insert_command(self,table,fields):
+
+        def build():
+            return f"insert into {table} ({','.join(fields)}) values({','.join('?'*len(fields))});"
+
+        return self._statement(('insert',table,tuple(fields)),build)
+
+
     def sql_command(self,command,modify_db=False):
         '''
         Perform sqlite commands on the database.
@@ -141,32 +1391,42 @@ class SqliteInterface:
         :return: list of tuples
         '''
 
-        self.cursor.execute(command)
-
-        if modify_db:
-            self.connection.commit()
-        else:
-            return self.cursor.fetchall()
+        with self._lock:
+            if modify_db:
+                self._execute_write(command)
+            else:
+                try:
+                    self.cursor.execute(command)
+                except Exception:
+                    self._rollback()
+                    raise
+                return self.cursor.fetchall()
 
-    def delete_rows(self,table,query):
+    def delete_rows(self,table,query,params=None):
         '''
         Delete rows which satisfy the condition in query.
 
         Example usage:
         - delete all sporting goods
             db.delete_rows(table='items',query='categories="Sporting Goods"')
+        - bind the category to a ? placeholder
+            db.delete_rows(table='items',query='category=?',params=('Sporting Goods',))
 
         :param table: (str) name of table
         :param query: (str) query expression to perform e.g. 'height<5'
+        :param params: tuple values bound to ? placeholders in query
         :return: 0
         '''
 
-        self.cursor.execute(f"delete from {table} where {query};")
-        self.connection.commit()
+        command = self._statement(('delete',table,query),lambda: f"delete from {table} where {query};")
+        with self._lock:
+            self._diagnose(self.connection,command,params,table,query)
+            self._execute_write(command,params or (),table)
 
     def delete_table(self,table):
         '''
-        Delete an entire table from the database.
+        Delete an entire table from the database, together with its full-text search index (see
+        create_search_index) if it has one.
 
         Example usage:
             db.delete_table(table='items')
@@ -175,8 +1435,15 @@ class SqliteInterface:
         :return: 0
         '''
 
-        self.cursor.execute(f"drop table {table};")
-        self.connection.commit()
+        name = f"{table}_fts"
+        with self.transaction():
+            with self._lock:
+                index = self.cursor.execute("select sql from sqlite_master where type='table' and name=?;",
+                                            (name,)).fetchone()
+                # the index's triggers are dropped with the table
+                self._execute_write(f"drop table {table};",table=table)
+                if index is not None and f"content='{table}'" in index[0]:
+                    self._execute_write(f"drop table {name};",table=table)
 
     def clear_table(self,table):
         '''
@@ -189,8 +1456,8 @@ class SqliteInterface:
         :return: 0
         '''
 
-        self.cursor.execute(f"delete from {table};")
-        self.connection.commit()
+        with self._lock:
+            self._execute_write(f"delete from {table};",table=table)
 
     def get_distinct_values(self,table,field):
         '''
@@ -205,39 +1472,624 @@ class SqliteInterface:
         :return: list(str)
         '''
 
-        self.cursor.execute(f"select distinct {field} from {table};")
-        return self.cursor.fetchall()
+        if self._result_cache is not None:
+            return self._cached(('distinct',table,field),table,lambda: self._get_distinct_values(table,field))
+        return self._get_distinct_values(table,field)
+
+    def aggregate(self,table,metrics,group_by=None,query=None,params=None,output_json=False,output=None):
+        '''
+        Compute aggregates (optionally per group) inside the database, with GROUP BY, rather than reading whole
+        columns into python.
+
+        Each metric is named <field>_<function> (e.g. price_avg), apart from counts of rows ('*') which are named count.
+        Supported functions are count, count_distinct, sum, total, avg, min, max and group_concat (only count for '*').
+
+        Example usage:
+        - number of items, and the average and maximum price, per category
+            queries = db.aggregate(table='items',group_by='category',metrics={'price':['avg','max'],'*':['count']})
+        - as a dictionary with the category as key
+            queries = db.aggregate(table='items',group_by='category',metrics={'*':['count']},output_json=True)
+        - total price of stocked items (no grouping)
+            queries = db.aggregate(table='items',metrics={'price':['sum']},query='stocked=?',params=(1,),output_json=True)
+
+        :param table: (str) name of table
+        :param metrics: (dict) keys = field names (or '*'), values = list of aggregate functions for that field
+        :param group_by: (str) or tuple(str) field(s) to group by. Default None aggregates over all (matching) rows.
+        :param query: (str) query expression to perform e.g. 'height<5'
+        :param params: tuple values bound to ? placeholders in query
+        :param output_json: (bool) True: returns a dictionary (group value, or tuple of group values, as key) of
+            dictionaries of metrics. Without group_by, returns a single dictionary of metrics.
+        :param output: (str) 'columns': returns a dictionary of lists (group fields and metric names as keys)
+        :return: list of tuples (group values, then metrics in order)
+        '''
+
+        if output not in (None,'columns'):
+            raise ValueError(f"output must be None or 'columns', not {output!r}")
+        if isinstance(group_by,str):
+            group_by = (group_by,)
+        group_by = tuple(group_by or ())
+
+        names = []
+        expressions = []
+        for field,functions in metrics.items():
+            if isinstance(functions,str):
+                functions = [functions]
+            for function in functions:
+                if function not in _AGGREGATES:
+                    raise ValueError(f"unsupported aggregate {function!r}, use one of {', '.join(_AGGREGATES)}")
+                if field == '*' and function != 'count':
+                    raise ValueError(f"only count can be applied to '*', not {function!r}")
+                names.append(function if field == '*' else f"{field}_{function}")
+                expressions.append(_AGGREGATES[function].format(field))
+
+        def load():
+            def build():
+                select_str = ','.join(group_by + tuple(expressions))
+                command = f"select {select_str} from {table}"
+                if query:
+                    command += f" where {query}"
+                if group_by:
+                    command += f" group by {','.join(group_by)} order by {','.join(group_by)}"
+                return command + ';'
+
+            command = self._statement(('aggregate',table,group_by,tuple(expressions),query),build)
+            with self._read_connection() as connection:
+                self._diagnose(connection,command,params,table,query)
+                return connection.execute(command,params or ()).fetchall()
+
+        if self._result_cache is not None:
+            key = ('aggregate',table,group_by,tuple(expressions),query.strip() if query else None,_params_key(params))
+            data = self._cached(key,table,load)
+        else:
+            data = load()
+
+        num_groups = len(group_by)
+        if output == 'columns':
+            columns = list(zip(*data)) if data else [()] * (num_groups + len(names))
+            return {name:list(column) for name,column in zip(group_by + tuple(names),columns)}
+        if output_json:
+            if not group_by:
+                return dict(zip(names,data[0]))
+            return {(row[0] if num_groups == 1 else row[:num_groups]):dict(zip(names,row[num_groups:])) for row in data}
+        return data
+
+    def _get_distinct_values(self,table,field):
+
+        command = f"select distinct {field} from {table};"
+        with self._read_connection() as connection:
+            self._diagnose(connection,command,None,table,None)
+            return connection.execute(command).fetchall()
 
 
 
-    def update_fields(self,table,update,query):
+    def update_fields(self,table,update,query,params=None):
         '''
-        Update specific fields for a row.
+        Update specific fields for a row. The updated values are bound as parameters.
 
         Example usage:
         - update the price and stocked status of the basketball item
             update = {"price": 5.0, "stocked": 1}
             db.update_fields(table="items", update=update, query='(name="Basketball")')
+        - bind the name to a ? placeholder
+            db.update_fields(table="items", update=update, query='name=?', params=('Basketball',))
 
         :param table: (str)
         :param update: (dict) keys = field names, values = updated values for those fields
         :param query: (str) query expression to perform e.g. 'height<5'
+        :param params: tuple values bound to ? placeholders in query
         :return: 0
         '''
-        update_str = ''
-        for key, value in update.items():
-            update_str = update_str + key + '='
-            if type(value) == str:
-                update_str = update_str + f'\"{value}\",'
-            else:
-                update_str = update_str + f'{value},'
-        update_str = update_str.rsplit(',',1)[0]
+        fields = tuple(update.keys())
+
+        def build():
+            update_str = ','.join(f'{field}=?' for field in fields)
+            return f"update {table} set {update_str} where {query};"
+
+        command = self._statement(('update',table,fields,query),build)
+        values = tuple(update.values()) + tuple(params or ())
+        with self._lock:
+            self._diagnose(self.connection,command,values,table,query)
+            self._execute_write(command,values,table)
+
+
+    def create_index(self,table,fields,name=None,unique=False):
+        '''
+        Create an index on one or more fields of a table (if it does not already exist), so that queries, updates and
+        deletes with predicates on those fields can search the index instead of scanning the whole table.
+
+        Example usage:
+        - index the category field of the items table
+            db.create_index(table='items',fields=('category',))
+        - a unique index over two fields, with a custom name
+            db.create_index(table='items',fields=('category','name'),name='items_by_category',unique=True)
+
+        :param table: (str) name of table
+        :param fields: tuple(str) fields to index, in order
+        :param name: (str) name of the index. Default None uses idx_<table>_<fields>
+        :param unique: (bool) True: the index also enforces that the fields are unique
+        :return: (str) name of the index
+        '''
+
+        if name is None:
+            name = f"idx_{table}_{'_'.join(fields)}"
+        unique_str = 'unique ' if unique else ''
+
+        with self._lock:
+            self._execute_write(f"create {unique_str}index if not exists {name} on {table} ({','.join(fields)});",
+                                table=table)
+        self._forget_query_plans()
+        return name
+
+    def drop_index(self,name):
+        '''
+        Delete an index (if it exists).
+
+        Example usage:
+            db.drop_index(name='idx_items_category')
+
+        :param name: (str) name of the index
+        :return: 0
+        '''
+
+        with self._lock:
+            self._execute_write(f"drop index if exists {name};")
+        self._forget_query_plans()
+
+    def list_indexes(self,table=None):
+        '''
+        List the indexes of the database, including the automatic indexes sqlite creates for primary keys and unique
+        constraints.
+
+        Example usage:
+            indexes = db.list_indexes(table='items')
+
+        :param table: (str) only list indexes on this table. Default None lists indexes on all tables.
+        :return: dictionary of dictionaries (index name as key) e.g. {'idx_items_category':{'table':'items','fields':['category'],'unique':False}}
+        '''
+
+        tables = [table] if table else self.tables
+        indexes = {}
+        with self._read_connection() as connection:
+            for t in tables:
+                for e in connection.execute(f"pragma index_list([{t}])").fetchall():
+                    fields = [info[2] for info in connection.execute(f"pragma index_info([{e[1]}])").fetchall()]
+                    indexes[e[1]] = {'table':t,'fields':fields,'unique':bool(e[2])}
+        return indexes
+
+    def create_search_index(self,table,fields,tokenize=None):
+        '''
+        Build a full-text search index (an FTS5 virtual table named <table>_fts) over text fields of a table, for use
+        by search. The index is filled from the existing rows, and kept in sync with later inserts, deletes and updates
+        of the indexed fields by triggers on the table. It stores no copy of the text (it reads it from the table), and
+        the table must have a rowid (i.e. not be a WITHOUT ROWID table).
+
+        The default tokenizer matches whole words. tokenize='trigram' indexes every 3 character sequence instead, so
+        search matches substrings (of at least 3 characters), as a LIKE '%...%' query does, at the cost of a larger
+        index.
+
+        Example usage:
+        - index item names and categories
+            db.create_search_index(table='items',fields=('name','category'))
+        - match word stems (e.g. "balls" matches "ball")
+            db.create_search_index(table='items',fields=('name',),tokenize='porter unicode61')
+        - match substrings (e.g. "ball" matches "Football")
+            db.create_search_index(table='items',fields=('name',),tokenize='trigram')
+
+        :param table: (str) name of table
+        :param fields: tuple(str) text fields to index
+        :param tokenize: (str) FTS5 tokenizer. Default None uses unicode61.
+        :return: (str) name of the index
+        '''
 
-        self.cursor.execute(f"update {table} set {update_str} where {query};")
-        self.connection.commit()
+        name = f"{table}_fts"
+        columns = ','.join(fields)
+        new_values = ','.join(f'new.{field}' for field in fields)
+        old_values = ','.join(f'old.{field}' for field in fields)
+        tokenize_str = f",tokenize='{tokenize}'" if tokenize else ''
+        # updates of other fields leave the index alone, unless they change the rowid (an INTEGER PRIMARY KEY)
+        updated = list(fields)
+        info = self._table_schema(table)
+        key = info.get('primary_key')
+        if key and key not in updated and info['field_info'][key]['type'].upper() == 'INTEGER':
+            updated.append(key)
 
+        insert = f"insert into {name}(rowid,{columns}) values(new.rowid,{new_values});"
+        delete = f"insert into {name}({name},rowid,{columns}) values('delete',old.rowid,{old_values});"
+        commands = [
+            f"create virtual table {name} using fts5({columns},content='{table}',content_rowid='rowid'{tokenize_str});",
+            f"create trigger {name}_ai after insert on {table} begin {insert} end;",
+            f"create trigger {name}_ad after delete on {table} begin {delete} end;",
+            f"create trigger {name}_au after update of {','.join(updated)} on {table} begin {delete} {insert} end;",
+            f"insert into {name}({name}) values('rebuild');",
+        ]
+        with self.transaction():
+            with self._lock:
+                for command in commands:
+                    self.cursor.execute(command)
+                self._commit(table)
+        return name
 
-    def export_fields_to_csv(self):
+    def drop_search_index(self,table):
+        '''
+        Delete the full-text search index of a table (if it exists), and the triggers that keep it in sync.
+
+        Example usage:
+            db.drop_search_index(table='items')
+
+        :param table: (str) name of table
+        :return: 0
+        '''
+
+        name = f"{table}_fts"
+        with self.transaction():
+            with self._lock:
+                for suffix in ('ai','ad','au'):
+                    self.cursor.execute(f"drop trigger if exists {name}_{suffix};")
+                self.cursor.execute(f"drop table if exists {name};")
+                self._commit(table)
+
+    def search(self,table,text,display_fields=None,limit=10,output_json=False):
+        '''
+        Full-text search of a table through its search index (see create_search_index), returning the best matching rows
+        first (ranked by bm25). Unlike a LIKE '%...%' query, it does not scan the table.
+
+        text is an FTS5 query: words are matched as whole tokens (case-insensitively), and all of them must appear.
+        A trailing * matches a prefix, "..." a phrase, and OR / NOT combine terms. So "ball" does not match "Football",
+        unless the index was built with tokenize='trigram' (see create_search_index).
+
+        Example usage:
+        - the 10 best matches for "ball"
+            queries = db.search(table='items',text='ball')
+        - names and prices of items with a word starting with "bask"
+            queries = db.search(table='items',text='bask*',display_fields=('name','price'),limit=50)
+
+        :param table: (str) name of table
+        :param text: (str) FTS5 query
+        :param display_fields: tuple(str) column names to output for each returned query e.g. ('name','place'). If None, returns all columns.
+        :param limit: (int) maximum number of rows returned. None returns every match.
+        :param output_json: (bool) True: returns a dictionary of dictionaries (primary key as key, in rank order)
+            instead of a list of tuples.
+        :return: list of tuples
+        '''
+
+        name = f"{table}_fts"
+        info = self._table_schema(table)
+        fields = list(display_fields) if display_fields else list(info['fields'])
+
+        def build():
+            display_str = ','.join(f'{table}.{field}' for field in fields)
+            return (f"select {display_str} from {name} join {table} on {table}.rowid={name}.rowid "
+                    f"where {name} match ? order by {name}.rank limit ?;")
+
+        command = self._statement(('search',table,tuple(fields)),build)
+        values = (text,-1 if limit is None else limit)
+        with self._read_connection() as connection:
+            self._diagnose(connection,command,values,table,None)
+            data = connection.execute(command,values).fetchall()
+
+        if output_json:
+            key_idx = fields.index(info.get('primary_key'))
+            return {row[key_idx]:dict(zip(fields,row)) for row in data}
+        return data
+
+    def enable_query_diagnostics(self,scan_threshold=10000,warn=True):
+        '''
+        Run EXPLAIN QUERY PLAN on the statements issued by query, query_iter, get_distinct_values, delete_rows,
+        update_fields and the exports, and record (and optionally warn about) full scans of tables with at least
+        scan_threshold rows, with a suggested index where the predicate names fields of the table.
+
+        Each distinct statement is only explained the first time it is seen (bind values with params so repeated calls
+        share a statement). Row counts are taken once per table while diagnostics are enabled.
+
+        Example usage:
+            db.enable_query_diagnostics(scan_threshold=100000)
+            ...
+            report = db.query_diagnostics()
+
+        :param scan_threshold: (int) tables with fewer rows than this are not reported
+        :param warn: (bool) True: issue a QueryPlanWarning for each reported scan
+        '''
+
+        with self._diagnostics_lock:
+            self._diagnostics = {'threshold':scan_threshold,'warn':warn,'plans':{},'row_counts':{}}
+
+    def disable_query_diagnostics(self):
+        '''
+        Stop running EXPLAIN QUERY PLAN on queries, and discard the recorded diagnostics.
+        '''
+
+        with self._diagnostics_lock:
+            self._diagnostics = None
+
+    def query_diagnostics(self,scans_only=True):
+        '''
+        The query plans recorded since enable_query_diagnostics was called.
+
+        Example usage:
+            for command,info in db.query_diagnostics().items():
+                print(info['calls'],command,info['suggestion'])
+
+        :param scans_only: (bool) True: only return statements which scan a large table
+        :return: dictionary of dictionaries (statement as key) e.g. {"select name from items where category=?;":
+            {'plan':['SCAN items'],'scans':['items'],'calls':120,'suggestion':"db.create_index(table='items',fields=('category',))"}}
+        '''
+
+        with self._diagnostics_lock:
+            if self._diagnostics is None:
+                return {}
+            return {command:dict(info) for command,info in self._diagnostics['plans'].items()
+                    if info['scans'] or not scans_only}
+
+    def enable_result_cache(self,max_size=1024,ttl=None):
+        '''
+        Cache the results of query and get_distinct_values, keyed on their (normalised) arguments.
+
+        Cached results for a table are invalidated whenever this interface writes to it (insert_row, insert_rows,
+        update_fields, delete_rows, clear_table, delete_table and the imports), and all results are invalidated by
+        sql_command(modify_db=True) and by commits from other connections or processes (detected with
+        PRAGMA data_version). Results are only keyed on the table argument, so a query whose predicate reads other
+        tables (e.g. a subquery) is not invalidated by writes to those tables.
+
+        Cached results are shared between callers, so treat them as read-only.
+
+        Example usage:
+            db.enable_result_cache(max_size=10000,ttl=60)
+            ...
+            stats = db.result_cache_info()
+
+        :param max_size: (int) maximum number of cached results (least recently used results are evicted first)
+        :param ttl: (float) seconds a result stays valid. Default None keeps results until invalidated or evicted.
+        '''
+
+        self._result_cache = _ResultCache(max_size,ttl)
+
+    def disable_result_cache(self):
+        '''
+        Stop caching query results, and discard the cache.
+        '''
+
+        self._result_cache = None
+
+    def result_cache_info(self):
+        '''
+        Statistics of the result cache.
+
+        Example usage:
+            stats = db.result_cache_info()
+
+        :return: (dict) {'hits':..,'misses':..,'hit_rate':..,'invalidations':..,'size':..,'max_size':..,'ttl':..} or
+            None if the cache is not enabled
+        '''
+
+        if self._result_cache is None:
+            return None
+        return self._result_cache.info()
+
+    def _cached(self,key,table,load):
+
+        cache = self._result_cache
+        # in pooled mode another thread may be using the connection (e.g. in a long transaction); rather than wait,
+        # skip the cache for this call
+        if not self._lock.acquire(blocking=False):
+            return load()
+        try:
+            data_version = self.connection.execute("pragma data_version;").fetchone()[0]
+        finally:
+            self._lock.release()
+        if data_version != cache.data_version:
+            # another connection has committed since the last check
+            if cache.data_version is not None:
+                cache.invalidate()
+            cache.data_version = data_version
+
+        hit,value = cache.get(key)
+        if hit:
+            return value
+        token = cache.token(table)
+        value = load()
+        cache.put(key,table,value,token)
+        return value
+
+    def _forget_query_plans(self):
+
+        # plans change when indexes do, so statements are explained again the next time they are seen
+        with self._diagnostics_lock:
+            if self._diagnostics is not None:
+                self._diagnostics['plans'] = {}
+
+    def _diagnose(self,connection,command,params,table,query):
+
+        diagnostics = self._diagnostics
+        if diagnostics is None:
+            return
+
+        with self._diagnostics_lock:
+            info = diagnostics['plans'].get(command)
+            if info is not None:
+                info['calls'] += 1
+                return
+
+        # diagnostics are best effort: never let them fail the caller's query
+        try:
+            plan,scans,suggestion = self._explain(connection,diagnostics,command,params,table,query)
+        except sqlite3.Error:
+            return
+
+        with self._diagnostics_lock:
+            diagnostics['plans'][command] = {'plan':plan,'scans':scans,'calls':1,'suggestion':suggestion}
+
+        if scans and diagnostics['warn']:
+            message = f"full scan of {', '.join(scans)} by: {command}"
+            if suggestion:
+                message += f" (consider {suggestion})"
+            warnings.warn(message,QueryPlanWarning,stacklevel=3)
+
+    def _explain(self,connection,diagnostics,command,params,table,query):
+
+        plan = [e[3] for e in connection.execute(f"explain query plan {command}",params or ()).fetchall()]
+        # the plan names subqueries, CTEs and aliases in the same way as tables, so only count real tables
+        tables = {e[0] for e in connection.execute("SELECT name FROM sqlite_master WHERE type='table';").fetchall()}
+        scans = []
+        for detail in plan:
+            match = re.match(r'SCAN (?:TABLE )?(\w+)',detail)
+            if match and 'INDEX' not in detail and match.group(1) in tables:
+                scanned = match.group(1)
+                row_counts = diagnostics['row_counts']
+                if scanned not in row_counts:
+                    row_counts[scanned] = connection.execute(f"select count(*) from [{scanned}];").fetchone()[0]
+                if row_counts[scanned] >= diagnostics['threshold']:
+                    scans.append(scanned)
+
+        suggestion = None
+        if scans and query and table in scans:
+            # read from the connection in hand, as a pooled reader may not be free for the schema cache
+            table_fields = [e[1] for e in connection.execute(f"pragma table_info([{table}])").fetchall()]
+            fields = []
+            for token in re.findall(r'[A-Za-z_]\w*',re.sub(r'(\'[^\']*\'|"[^"]*")','',query)):
+                if token in table_fields and token not in fields:
+                    fields.append(token)
+            if fields:
+                suggestion = f"db.create_index(table='{table}',fields={tuple(fields)!r})"
+
+        return plan,scans,suggestion
+
+    def export_fields_to_csv(self,path,table,display_fields=None,query=None,params=None,batch_size=10000):
+        '''
+        Export (selective fields of) a table to a csv file, with a header row of field names.
+
+        Rows are fetched and written batch_size at a time, so memory use is bounded regardless of table size. NULL
+        values are written as empty strings.
+
+        Example usage:
+        - export the whole items table
+            stats = db.export_fields_to_csv('items.csv',table='items')
+        - export the names and prices of items cheaper than 50
+            stats = db.export_fields_to_csv('items.csv',table='items',display_fields=('name','price'),query='price<?',params=(50,))
+
+        :param path: (str) csv file to write
+        :param table: (str) name of table
+        :param display_fields: tuple(str) column names to export e.g. ('name','place'). If None, exports all columns.
+        :param query: (str) query expression to perform e.g. 'height<5'
+        :param params: tuple values bound to ? placeholders in query
+        :param batch_size: (int) number of rows fetched and written at a time
+        :return: (dict) throughput stats: {'rows':..,'elapsed':.. (seconds),'rows_per_sec':..}
+        '''
+
+        with open(path,'w',newline='',encoding='utf-8') as f:
+            writer = csv.writer(f)
+            return self._export(writer.writerow,writer.writerows,table,display_fields,query,params,batch_size)
+
+    def export_fields_to_ndjson(self,path,table,display_fields=None,query=None,params=None,batch_size=10000):
+        '''
+        Export (selective fields of) a table to a newline-delimited json file, one json object per row.
+
+        Rows are fetched and written batch_size at a time, so memory use is bounded regardless of table size. NULL
+        values are written as null, and BLOB values as base64 strings.
+
+        Example usage:
+            stats = db.export_fields_to_ndjson('items.ndjson',table='items',display_fields=('name','price'))
+
+        :param path: (str) ndjson file to write
+        :param table: (str) name of table
+        :param display_fields: tuple(str) column names to export e.g. ('name','place'). If None, exports all columns.
+        :param query: (str) query expression to perform e.g. 'height<5'
+        :param params: tuple values bound to ? placeholders in query
+        :param batch_size: (int) number of rows fetched and written at a time
+        :return: (dict) throughput stats: {'rows':..,'elapsed':.. (seconds),'rows_per_sec':..}
+        '''
+
+        with open(path,'w',encoding='utf-8') as f:
+            fields = []
+
+            def write_header(names):
+                fields.extend(names)
+
+            def write_rows(rows):
+                f.write(''.join(json.dumps(dict(zip(fields,row)),default=_json_default) + '\n' for row in rows))
+
+            return self._export(write_header,write_rows,table,display_fields,query,params,batch_size)
+
+    def _export(self,write_header,write_rows,table,display_fields,query,params,batch_size):
+
+        num_rows = 0
+        start = time.perf_counter()
+        command = self._select_command(table,display_fields,query)
+        with self._read_connection() as connection:
+            self._diagnose(connection,command,params,table,query)
+            cursor = connection.execute(command,params or ())
+            try:
+                write_header([d[0] for d in cursor.description])
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    write_rows(rows)
+                    num_rows += len(rows)
+            finally:
+                cursor.close()
+        elapsed = time.perf_counter() - start
+
+        return {'rows':num_rows,'elapsed':elapsed,'rows_per_sec':num_rows/elapsed if elapsed > 0 else float('inf')}
+
+    def import_csv(self,path,table,field_map=None,batch_size=10000):
+        '''
+        Bulk load a csv file (with a header row) into a table.
+
+        The file is streamed through insert_rows in batches of batch_size rows, inside a single transaction (so either
+        the whole file is loaded, or nothing is). Values are read as strings and converted by the column's type
+        affinity (e.g. '49.99' is stored as a REAL in a REAL column). Empty values are loaded as NULL, except in TEXT
+        columns where they are loaded as empty strings, so a file written by export_fields_to_csv round trips (apart
+        from NULLs in TEXT columns).
+
+        Example usage:
+        - load a csv whose header matches the table's field names
+            stats = db.import_csv('items.csv',table='items')
+        - map the csv's "cost" column to the "price" field, and ignore the other columns
+            stats = db.import_csv('items.csv',table='items',field_map={"name":"name","price":"cost"})
+
+        :param path: (str) csv file to read
+        :param table: (str) name of table to insert into
+        :param field_map: e.g. {'a':'a','b':'c'}. db-field:csv-column. If None, every table field with a matching csv
+            column is loaded.
+        :param batch_size: (int) number of rows bound per executemany
+        :return: (dict) throughput stats (see insert_rows)
+        '''
+
+        info = self._table_schema(table)
+        with open(path,newline='',encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            if field_map is None:
+                columns = reader.fieldnames or []
+                field_map = {field:field for field in info['fields'] if field in columns}
+            null_columns = {column for field,column in field_map.items()
+                            if field not in info['field_info'] or not _text_affinity(info['field_info'][field])}
+            entries = ({column:(None if value == '' and column in null_columns else value)
+                        for column,value in row.items()} for row in reader)
+            with self.transaction():
+                return self.insert_rows(entries,table,field_map,batch_size=batch_size)
+
+    def import_ndjson(self,path,table,field_map=None,batch_size=10000):
+        '''
+        Bulk load a newline-delimited json file (one json object per line) into a table.
+
+        The file is streamed through insert_rows in batches of batch_size rows, inside a single transaction (so either
+        the whole file is loaded, or nothing is). Blank lines are skipped.
+
+        Example usage:
+            stats = db.import_ndjson('items.ndjson',table='items')
+
+        :param path: (str) ndjson file to read
+        :param table: (str) name of table to insert into
+        :param field_map: e.g. {'a':'a','b':'c'}. db-field:json-field. If None, every table field is loaded from the
+            json-field of the same name (NULL if missing).
+        :param batch_size: (int) number of rows bound per executemany
+        :return: (dict) throughput stats (see insert_rows)
+        '''
 
-        pass
+        if field_map is None:
+            field_map = {field:field for field in self.fields[table]}
+        with open(path,encoding='utf-8') as f:
+            entries = (json.loads(line) for line in f if line.strip())
+            with self.transaction():
+                return self.insert_rows(entries,table,field_map,batch_size=batch_size)
 
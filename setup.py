@@ -28,4 +28,7 @@ setup(
         "pymongo[srv]",
         "firebase-admin"
     ],
+    extras_require={
+        "numpy": ["numpy"],
+    },
 )
@@ -0,0 +1,27 @@
+import shutil
+
+import pytest
+
+
+@pytest.fixture
+def shop_db(tmp_path):
+    '''
+    Path to a scratch copy of the example shop database, so tests can mutate it freely.
+    '''
+
+    path = tmp_path / 'shop.db'
+    shutil.copy('data/shop.db', path)
+    return str(path)
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    '''
+    MongoInterface backed by an in-process mongomock client (skipped if mongomock is not installed).
+    '''
+
+    mongomock = pytest.importorskip('mongomock')
+    from pydatabase import mongo_interface
+
+    monkeypatch.setattr(mongo_interface.pymongo, 'MongoClient', mongomock.MongoClient)
+    return mongo_interface.MongoInterface('shopdb')
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from pydatabase.async_sqlite_interface import AsyncSqliteInterface
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+def test_async_query_and_iter():
+
+    async def run():
+        db = AsyncSqliteInterface('data/shop.db')
+        queries = await db.query(table='items', display_fields=('name', 'price'), query='price<?', params=(50,))
+        streamed = [row async for row in db.query_iter(table='items', display_fields=('name', 'price'),
+                                                       query='price<?', params=(50,), batch_size=2)]
+        await db.close()
+        return queries, streamed
+
+    queries, streamed = asyncio.run(run())
+    assert queries == [('Football', 49.99), ('Baseball', 9.99), ('Basketball', 29.99)]
+    assert streamed == queries
+
+
+
+def test_async_parallel_query_iter():
+
+    async def run():
+        db = AsyncSqliteInterface('data/shop.db')
+        streamed = [row async for row in db.parallel_query_iter(table='items', display_fields=('name',), workers=2,
+                                                                partitions=3, batch_size=1)]
+        await db.close()
+        return streamed
+
+    assert sorted(asyncio.run(run())) == sorted(SqliteInterface('data/shop.db').query(table='items',
+                                                                                      display_fields=('name',)))
+
+
+def test_async_query_with_open_streams(shop_db):
+
+    async def run():
+        db = AsyncSqliteInterface(shop_db, pool_size=2)
+        streams = [db.query_iter(table='items', display_fields=('name',), batch_size=1) for _ in range(2)]
+        for _ in range(3):
+            for stream in streams:
+                await stream.__anext__()
+        # both streams hold a reader, and the reads below run on both reader threads
+        queries = await asyncio.wait_for(asyncio.gather(*(db.query(table='items', query='price<?', params=(50,))
+                                                          for _ in range(4))), timeout=10)
+        for stream in streams:
+            await stream.aclose()
+        await db.close()
+        return queries
+
+    # the reader threads the streams are opened on vary from run to run
+    for _ in range(3):
+        assert [len(rows) for rows in asyncio.run(run())] == [3, 3, 3, 3]
+
+
+@pytest.mark.parametrize('pool_size', [None, 2])
+def test_async_transaction_rollback(shop_db, pool_size):
+
+    async def run():
+        db = AsyncSqliteInterface(shop_db, pool_size=pool_size)
+        with pytest.raises(ValueError):
+            async with db.transaction():
+                await db.clear_table(table='items')
+                raise ValueError
+        async with db.transaction():
+            await db.delete_rows(table='items', query='category=?', params=('Electronics',))
+        names = await db.get_distinct_values(table='items', field='category')
+        await db.close()
+        return names
+
+    assert asyncio.run(run()) == [('Sporting Goods',)]
+    assert len(SqliteInterface(shop_db).query(table='items')) == 3
+
+
+def test_async_schema_metadata():
+
+    async def run():
+        db = AsyncSqliteInterface('data/shop.db')
+        fields, key = db.fields['items'], db.primary_key['items']
+        await db.close()
+        return fields, key
+
+    assert asyncio.run(run()) == (['name', 'category', 'price', 'stocked'], 'name')
+
+
+@pytest.mark.parametrize('pool_size', [None, 2])
+def test_async_transaction_serialises_other_writers(shop_db, pool_size):
+
+    async def run():
+        db = AsyncSqliteInterface(shop_db, pool_size=pool_size)
+        started = asyncio.Event()
+
+        async def failing_block():
+            with pytest.raises(ValueError):
+                async with db.transaction():
+                    await db.clear_table(table='items')
+                    started.set()
+                    await asyncio.sleep(0.05)
+                    raise ValueError
+
+        async def other_writer():
+            await started.wait()
+            await db.delete_rows(table='items', query='category=?', params=('Electronics',))
+
+        await asyncio.gather(failing_block(), other_writer())
+        fields, tables = await db.get_fields('items'), await db.get_tables()
+        await db.close()
+        return fields, tables
+
+    fields, tables = asyncio.run(run())
+    assert fields == ['name', 'category', 'price', 'stocked'] and 'items' in tables
+    # the other coroutine's delete was neither rolled back with the block nor committed inside it
+    assert len(SqliteInterface(shop_db).query(table='items')) == 3
@@ -0,0 +1,36 @@
+import pytest
+
+
+def test_bulk_write_mixed_operations(mongo_db):
+
+    mongo_db.db['items'].insert_many([{"_id": i, "price": i, "stocked": i % 2 == 0} for i in range(6)])
+
+    operations = iter([
+        {'op': 'insert', 'doc': {"_id": 10, "price": 10, "stocked": True}},
+        {'op': 'update', 'id': 1, 'update': {"$set": {"price": 100}}},
+        {'op': 'update', 'query': {"stocked": True}, 'update': {"$inc": {"price": 1}}},
+        {'op': 'replace', 'id': 20, 'doc': {"price": 20, "stocked": False}, 'upsert': True},
+        {'op': 'delete', 'id': 3},
+        {'op': 'delete', 'query': {"price": {"$gt": 99}}},
+    ])
+    report = mongo_db.bulk_write(collection='items', operations=operations, batch_size=4, convertObjectId=False)
+
+    assert report['operations'] == 6 and report['batches'] == 2
+    assert report['inserted'] == 1 and report['upserted'] == 1 and report['deleted'] == 2
+    assert report['modified'] == 5 and report['errors'] == []
+    assert sorted(doc['_id'] for doc in mongo_db.db['items'].find()) == [0, 2, 4, 5, 10, 20]
+    assert mongo_db.db['items'].find_one({"_id": 10})['price'] == 11
+
+
+def test_bulk_write_errors(mongo_db):
+
+    operations = [{'op': 'insert', 'doc': {"_id": 1}}, {'op': 'insert', 'doc': {"_id": 1}},
+                  {'op': 'insert', 'doc': {"_id": 2}}]
+    report = mongo_db.bulk_write(collection='items', operations=operations, ordered=False)
+    assert report['inserted'] == 2
+    assert [error['index'] for error in report['errors']] == [1]
+
+    with pytest.raises(ValueError):
+        mongo_db.bulk_write(collection='items', operations=[{'op': 'upsert', 'id': 1}])
+    with pytest.raises(ValueError):
+        mongo_db.bulk_write(collection='items', operations=[{'op': 'delete'}])
@@ -0,0 +1,21 @@
+from bson.objectid import ObjectId
+
+
+def test_documents_by_id_in_batches(mongo_db):
+
+    ids = [ObjectId() for _ in range(7)]
+    mongo_db.db['user'].insert_many([{"_id": id, "age": i} for i, id in enumerate(ids)])
+    missing = str(ObjectId())
+    doc_ids = [str(ids[5]), missing, str(ids[1]), str(ids[3])]
+
+    docs = mongo_db.download_documents_by_id('user', doc_ids, batch_size=2)
+    assert list(docs) == doc_ids
+    assert docs[str(ids[5])] == {"_id": ids[5], "age": 5}
+    assert docs[missing] is None
+
+    assert mongo_db.update_fields_by_id(collection='user', doc_ids=ids[:3], update_dict={"$set": {"employed": True}},
+                                        convertObjectId=False, batch_size=2) == 3
+    assert mongo_db.db['user'].count_documents({"employed": True}) == 3
+
+    assert mongo_db.delete_documents_by_id(collection='user', doc_ids=doc_ids, batch_size=3) == 3
+    assert mongo_db.db['user'].count_documents({}) == 4
@@ -0,0 +1,30 @@
+def test_query_projection_and_cursor_options(mongo_db):
+
+    mongo_db.db['user'].insert_many([{"_id": i, "name": f"user{i}", "age": 20 + i, "bio": "x" * 100}
+                                     for i in range(10)])
+    mongo_db.db['user'].create_index([('age', 1)])
+
+    docs = mongo_db.query(collection='user', query_dict={"age": {"$gt": 25}}, display_fields=['name', 'age', 'email'],
+                          sort_field='age', ascend=False, num_results=2, batch_size=1, hint=[('age', 1)],
+                          max_time_ms=1000)
+    assert docs == {9: {'name': 'user9', 'age': 29}, 8: {'name': 'user8', 'age': 28}}
+
+    docs = mongo_db.download_collection(collection='user', display_fields=['_id', 'age'], output_dict=False,
+                                        batch_size=3)
+    assert docs[:2] == [{'_id': 0, 'age': 20}, {'_id': 1, 'age': 21}]
+    assert len(docs) == 10
+
+
+def test_iter_query_streams_documents(mongo_db):
+
+    mongo_db.db['user'].insert_many([{"name": f"user{i}", "age": 20 + i} for i in range(10)])
+
+    pairs = mongo_db.iter_query(collection='user', query_dict={"age": {"$gte": 25}}, display_fields=['name'],
+                                batch_size=2)
+    key, doc = next(pairs)
+    assert isinstance(key, str) and doc == {'name': 'user5'}
+    pairs.close()
+
+    assert dict(mongo_db.iter_collection(collection='user', batch_size=3)) == mongo_db.download_collection('user')
+    assert [doc['age'] for doc in mongo_db.iter_collection(collection='user', sort_field='age', ascend=False,
+                                                           num_results=3, output_dict=False)] == [29, 28, 27]
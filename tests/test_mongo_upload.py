@@ -0,0 +1,25 @@
+import json
+
+
+def test_upload_collection_batches(mongo_db):
+
+    with open('data/product_data.json') as f:
+        data = json.load(f)
+
+    report = mongo_db.upload_collection(data, collection='items', batch_size=4)
+    assert report['documents'] == report['inserted'] == len(data)
+    assert len(report['batches']) == -(-len(data) // 4)
+    assert mongo_db.db['items'].find_one({'_id': 0})['name'] == data[0]['name']
+    assert '_id' not in data[0]
+
+
+def test_upload_collection_reports_duplicates(mongo_db):
+
+    docs = ({"_id": i % 3, "name": f"item{i}"} for i in range(5))
+    report = mongo_db.upload_collection(docs, collection='items', field_map={"_id": "_id", "name": "item_name"},
+                                        use_index_as_id=False, batch_size=10)
+
+    assert report['inserted'] == 3
+    assert report['duplicates'] == 2 and report['errors'] == 0
+    assert report['batches'][0]['duplicate_ids'] == [0, 1]
+    assert mongo_db.db['items'].find_one({'_id': 1}) == {'_id': 1, 'item_name': 'item1'}
@@ -0,0 +1,32 @@
+import pytest
+
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+def test_aggregate_group_by():
+
+    db = SqliteInterface('data/shop.db')
+    queries = db.aggregate(table='items', group_by='category', metrics={'price': ['min', 'max'], '*': ['count']})
+
+    assert queries == [('Electronics', 99.99, 399.99, 3), ('Sporting Goods', 9.99, 49.99, 3)]
+
+
+def test_aggregate_output_forms():
+
+    db = SqliteInterface('data/shop.db')
+    queries = db.aggregate(table='items', group_by=('category', 'stocked'), metrics={'*': 'count'}, output_json=True)
+    assert queries[('Sporting Goods', 1)] == {'count': 2}
+
+    queries = db.aggregate(table='items', metrics={'price': ['sum'], 'category': ['count_distinct']}, query='stocked=?',
+                           params=(1,), output_json=True)
+    assert queries == {'price_sum': pytest.approx(359.96), 'category_count_distinct': 2}
+
+    columns = db.aggregate(table='items', group_by='stocked', metrics={'price': ['max']}, output='columns')
+    assert columns == {'stocked': [0, 1], 'price_max': [399.99, 199.99]}
+
+    with pytest.raises(ValueError):
+        db.aggregate(table='items', metrics={'price': ['median']})
+    with pytest.raises(ValueError):
+        db.aggregate(table='items', metrics={'*': ['sum']})
+    with pytest.raises(ValueError):
+        db.aggregate(table='items', metrics={'price': ['max']}, output='numpy')
@@ -0,0 +1,54 @@
+import time
+
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+def test_result_cache_hits_and_invalidation(shop_db):
+
+    db = SqliteInterface(shop_db)
+    db.enable_result_cache(max_size=10)
+
+    first = db.query(table='items', display_fields=('name',), query='price<?', params=(50,))
+    assert db.query(table='items', display_fields=('name',), query=' price<? ', params=[50]) is first
+    assert db.get_distinct_values(table='items', field='category') == db.get_distinct_values(table='items',
+                                                                                               field='category')
+    assert db.result_cache_info()['hits'] == 2
+
+    db.update_fields(table='items', update={'price': 100.0}, query='name=?', params=('Football',))
+    assert db.query(table='items', display_fields=('name',), query='price<?', params=(50,)) == \
+        [('Baseball',), ('Basketball',)]
+
+    info = db.result_cache_info()
+    assert info['misses'] == 3
+    assert info['hit_rate'] == 0.4
+
+
+def test_result_cache_detects_other_connections(shop_db):
+
+    db = SqliteInterface(shop_db)
+    db.enable_result_cache()
+    assert len(db.query(table='items')) == 6
+
+    other = SqliteInterface(shop_db)
+    other.delete_rows(table='items', query='category=?', params=('Electronics',))
+
+    assert len(db.query(table='items')) == 3
+
+
+def test_result_cache_ttl_and_rollback(shop_db):
+
+    db = SqliteInterface(shop_db)
+    db.enable_result_cache(ttl=0.05)
+    db.query(table='items')
+    time.sleep(0.1)
+    db.query(table='items')
+    assert db.result_cache_info()['hits'] == 0
+
+    try:
+        with db.transaction():
+            db.clear_table(table='items')
+            assert db.query(table='items') == []
+            raise ValueError
+    except ValueError:
+        pass
+    assert len(db.query(table='items')) == 6
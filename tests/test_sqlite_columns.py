@@ -0,0 +1,65 @@
+from array import array
+
+import pytest
+
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+def test_query_columns():
+
+    db = SqliteInterface('data/shop.db')
+    columns = db.query(table='items', display_fields=('name', 'price', 'stocked'), query='price<50', output='columns',
+                       batch_size=2)
+
+    assert columns == {'name': ['Football', 'Baseball', 'Basketball'], 'price': array('d', [49.99, 9.99, 29.99]),
+                       'stocked': array('q', [1, 1, 0])}
+
+
+def test_query_numpy(shop_db):
+
+    np = pytest.importorskip('numpy')
+
+    db = SqliteInterface(shop_db)
+    db.sql_command("create table ratings (id INTEGER PRIMARY KEY, score REAL, note TEXT);", modify_db=True)
+    db.sql_command("insert into ratings (score, note) values (4.5, 'good'), (NULL, NULL);", modify_db=True)
+
+    arrays = db.query(table='items', display_fields=('price', 'stocked'), output='numpy')
+    assert arrays['stocked'].dtype == np.int64
+    assert arrays['price'].sum() == pytest.approx(789.94)
+
+    records = db.query(table='ratings', output='structured')
+    assert records.dtype.names == ('id', 'score', 'note')
+    assert records['id'].tolist() == [1, 2]
+    assert records['score'][0] == 4.5 and np.isnan(records['score'][1])
+    assert records['note'].tolist() == ['good', None]
+
+
+def test_query_columns_mistyped_values(shop_db):
+
+    db = SqliteInterface(shop_db)
+    db.sql_command("update items set stocked='unknown' where name='Nexus 7';", modify_db=True)
+    columns = db.query(table='items', display_fields=('stocked',), output='columns', batch_size=4)
+
+    assert columns == {'stocked': [1, 1, 0, 1, 0, 'unknown']}
+
+
+def test_query_columns_nullable_numeric(shop_db):
+
+    np = pytest.importorskip('numpy')
+
+    db = SqliteInterface(shop_db)
+    db.sql_command("create table counts (id INTEGER PRIMARY KEY, total INTEGER, score REAL);", modify_db=True)
+    db.sql_command(f"insert into counts values (1, {2**53 + 1}, 0.5), (2, 3, 1.5);", modify_db=True)
+
+    columns = db.query(table='counts', output='columns')
+    assert columns == {'id': array('q', [1, 2]), 'total': array('q', [2**53 + 1, 3]), 'score': array('d', [0.5, 1.5])}
+
+    arrays = db.query(table='counts', output='numpy')
+    assert arrays['id'].dtype == np.int64 and arrays['total'].dtype == np.int64
+    assert arrays['total'][0] == 2**53 + 1
+
+    db.sql_command("insert into counts values (3, NULL, NULL);", modify_db=True)
+    columns = db.query(table='counts', output='columns', batch_size=2)
+    assert columns['id'] == array('q', [1, 2, 3])
+    assert columns['total'] == [2**53 + 1, 3, None]
+    assert db.query(table='counts', output='numpy')['total'].dtype == np.float64
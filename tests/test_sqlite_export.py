@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+def test_export_import_csv(shop_db, tmp_path):
+
+    path = str(tmp_path / 'items.csv')
+    db = SqliteInterface(shop_db)
+    stats = db.export_fields_to_csv(path, table='items', query='price<?', params=(50,), batch_size=2)
+    assert stats['rows'] == 3
+    with open(path) as f:
+        assert f.readline().strip() == 'name,category,price,stocked'
+
+    expected = db.query(table='items', query='price<50')
+    db.clear_table(table='items')
+    stats = db.import_csv(path, table='items')
+
+    assert stats['rows'] == 3
+    assert db.query(table='items') == expected
+
+
+def test_export_import_ndjson(shop_db, tmp_path):
+
+    path = str(tmp_path / 'items.ndjson')
+    db = SqliteInterface(shop_db)
+    db.export_fields_to_ndjson(path, table='items', display_fields=('name', 'category', 'price', 'stocked'))
+
+    expected = db.query(table='items')
+    db.clear_table(table='items')
+    stats = db.import_ndjson(path, table='items', batch_size=4)
+
+    assert stats['rows'] == 6
+    assert stats['batches'] == 2
+    assert db.query(table='items') == expected
+
+
+def test_import_rolls_back_on_error(shop_db, tmp_path):
+
+    path = tmp_path / 'items.ndjson'
+    path.write_text('{"name": "Frisbee", "category": "Toys", "price": 5, "stocked": 1}\n'
+                    '{"name": "Football", "category": "Toys", "price": 5, "stocked": 1}\n')
+    db = SqliteInterface(shop_db)
+    with pytest.raises(sqlite3.IntegrityError):
+        db.import_ndjson(str(path), table='items', batch_size=1)
+
+    assert db.query(table='items', query='name="Frisbee"') == []
+
+
+def test_export_import_nulls_and_blobs(shop_db, tmp_path):
+
+    db = SqliteInterface(shop_db)
+    db.sql_command("create table readings (id INTEGER PRIMARY KEY, label TEXT, value REAL, raw BLOB);", modify_db=True)
+    field_map = {'id': 'id', 'label': 'label', 'value': 'value', 'raw': 'raw'}
+    db.insert_rows([{'id': 1, 'label': 'a', 'value': 1.5}, {'id': 2, 'label': '', 'value': None},
+                    {'id': 3, 'label': 'c', 'value': 0.0, 'raw': b'\x00\xff'}], table='readings', field_map=field_map)
+
+    path = str(tmp_path / 'readings.ndjson')
+    db.export_fields_to_ndjson(path, table='readings', query='id=?', params=(3,))
+    with open(path) as f:
+        assert f.read() == '{"id": 3, "label": "c", "value": 0.0, "raw": "AP8="}\n'
+
+    expected = db.query(table='readings', display_fields=('id', 'label', 'value'))
+
+    path = str(tmp_path / 'readings.csv')
+    db.export_fields_to_csv(path, table='readings', display_fields=('id', 'label', 'value'))
+    db.clear_table(table='readings')
+    db.import_csv(path, table='readings')
+    assert db.query(table='readings', display_fields=('id', 'label', 'value')) == expected
+
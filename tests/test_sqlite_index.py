@@ -0,0 +1,50 @@
+import pytest
+
+from pydatabase.sqlite_interface import SqliteInterface, QueryPlanWarning
+
+
+def test_create_list_drop_index(shop_db):
+
+    db = SqliteInterface(shop_db)
+    name = db.create_index(table='items', fields=('category', 'price'))
+
+    assert name == 'idx_items_category_price'
+    assert db.list_indexes(table='items')[name] == {'table': 'items', 'fields': ['category', 'price'], 'unique': False}
+    assert db.list_indexes()['sqlite_autoindex_items_1']['unique']
+
+    db.drop_index(name=name)
+    assert name not in db.list_indexes(table='items')
+
+
+def test_query_diagnostics(shop_db):
+
+    db = SqliteInterface(shop_db)
+    db.enable_query_diagnostics(scan_threshold=5)
+
+    with pytest.warns(QueryPlanWarning, match="create_index"):
+        db.query(table='items', display_fields=('name',), query='category=?', params=('Electronics',))
+    db.query(table='items', display_fields=('name',), query='category=?', params=('Sporting Goods',))
+
+    report = db.query_diagnostics()
+    info = report["select name from items where category=?;"]
+    assert info['scans'] == ['items']
+    assert info['calls'] == 2
+    assert info['suggestion'] == "db.create_index(table='items',fields=('category',))"
+
+    db.create_index(table='items', fields=('category',))
+    db.query(table='items', display_fields=('name',), query='category=?', params=('Electronics',))
+    db.query(table='items', display_fields=('name',), query='name=?', params=('Football',))
+    assert db.query_diagnostics() == {}
+    assert len(db.query_diagnostics(scans_only=False)) == 2
+
+
+def test_query_diagnostics_ignore_subquery_aliases(shop_db):
+
+    db = SqliteInterface(shop_db)
+    db.enable_query_diagnostics(scan_threshold=5, warn=False)
+    query = 'exists (select 1 from (select * from items limit 3) s where s.name=items.name)'
+    names = db.query(table='items', display_fields=('name',), query=query)
+
+    assert sorted(names) == [('Baseball',), ('Basketball',), ('Football',)]
+    info = db.query_diagnostics(scans_only=False)[f"select name from items where {query};"]
+    assert info['scans'] == ['items']
@@ -0,0 +1,26 @@
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+def test_insert_rows_generator(shop_db):
+
+    field_map = {"name": "name", "category": "category", "price": "cost", "stocked": "stocked"}
+    entries = ({"name": f"item{i}", "category": "Toys", "cost": float(i), "stocked": 1} for i in range(25))
+
+    db = SqliteInterface(shop_db)
+    stats = db.insert_rows(entries=entries, table='items', field_map=field_map, batch_size=10)
+
+    assert stats['rows'] == 25
+    assert stats['batches'] == 3
+    assert db.query(table='items', display_fields=('name', 'price'), query='name="item7"') == [('item7', 7.0)]
+    assert len(db.query(table='items', query='category="Toys"')) == 25
+
+
+def test_insert_rows_quoted_strings(shop_db):
+
+    field_map = {"name": "name", "category": "category", "price": "price", "stocked": "stocked"}
+    entries = [{"name": 'The "Best" Ball', "category": "Sporting Goods", "price": 1.5, "stocked": 0}]
+
+    db = SqliteInterface(shop_db)
+    db.insert_rows(entries=entries, table='items', field_map=field_map)
+
+    assert db.query(table='items', display_fields=('name',), query="price=1.5") == [('The "Best" Ball',)]
@@ -0,0 +1,80 @@
+import sqlite3
+import time
+
+import pytest
+
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+def count_rows(path):
+
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("select count(*) from items;").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_in_memory_flushes_on_flush_and_close(shop_db):
+
+    db = SqliteInterface(shop_db, in_memory=True)
+    assert len(db.query(table='items')) == 6
+
+    db.delete_rows(table='items', query='category=?', params=('Electronics',))
+    assert len(db.query(table='items')) == 3
+    assert count_rows(shop_db) == 6
+
+    assert db.flush()
+    assert not db.flush()
+    assert count_rows(shop_db) == 3
+
+    with db.transaction():
+        db.clear_table(table='items')
+        assert not db.flush()
+    db.close()
+    assert count_rows(shop_db) == 0
+
+
+def test_in_memory_flush_interval(shop_db):
+
+    db = SqliteInterface(shop_db, in_memory=True, flush_interval=0)
+    db.delete_rows(table='items', query='stocked=?', params=(0,))
+    assert count_rows(shop_db) == 4
+    db.close()
+
+    db = SqliteInterface(shop_db, in_memory=True, flush_interval=0.05)
+    db.clear_table(table='items')
+    time.sleep(0.5)
+    assert count_rows(shop_db) == 0
+    db.close()
+
+
+def test_in_memory_rejects_file_readers(shop_db):
+
+    with pytest.raises(ValueError):
+        SqliteInterface(shop_db, in_memory=True, pool_size=4)
+
+    db = SqliteInterface(shop_db, in_memory=True)
+    with pytest.raises(ValueError):
+        db.parallel_query(table='items')
+    db.close()
+
+
+def test_in_memory_flushes_after_failed_write(shop_db):
+
+    field_map = {"name": "name", "category": "category", "price": "price", "stocked": "stocked"}
+    db = SqliteInterface(shop_db, in_memory=True)
+    db.insert_row(entry={"name": "Tennis Ball", "category": "Sporting Goods", "price": 2.0, "stocked": 1}, table='items', field_map=field_map)
+    with pytest.raises(sqlite3.IntegrityError):
+        db.insert_row(entry={"name": "Football", "price": 1.0}, table='items', field_map=field_map)
+    assert not db.connection.in_transaction
+    assert db.flush()
+    assert count_rows(shop_db) == 7
+
+    db.update_fields(table='items', update={"price": 3.0}, query='name=?', params=('Tennis Ball',))
+    with pytest.raises(sqlite3.IntegrityError):
+        db.update_fields(table='items', update={"name": "Football"}, query='name=?', params=('Tennis Ball',))
+    db.close()
+    connection = sqlite3.connect(shop_db)
+    assert connection.execute("select price from items where name='Tennis Ball';").fetchone() == (3.0,)
+    connection.close()
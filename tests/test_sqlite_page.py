@@ -0,0 +1,69 @@
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+def test_query_page_walks_all_rows():
+
+    db = SqliteInterface('data/shop.db')
+    pages = []
+    token = None
+    while True:
+        rows, token = db.query_page(table='items', display_fields=('price',), page_size=4, after=token)
+        pages.append(rows)
+        if token is None:
+            break
+
+    assert pages == [[(9.99,), (29.99,), (49.99,), (199.99,)], [(399.99,), (99.99,)]]
+
+
+def test_query_page_order_field_and_filter():
+
+    db = SqliteInterface('data/shop.db')
+    rows, token = db.query_page(table='items', display_fields=('name', 'price'), query='price<?', params=(300,),
+                                order_field='price', page_size=2)
+    assert rows == [('Baseball', 9.99), ('Basketball', 29.99)]
+
+    rows, token = db.query_page(table='items', display_fields=('name', 'price'), query='price<?', params=(300,),
+                                order_field='price', page_size=2, after=token, output_json=True)
+    assert rows == {'Football': {'name': 'Football', 'price': 49.99}, 'iPod Touch': {'name': 'iPod Touch', 'price': 99.99}}
+
+    rows, token = db.query_page(table='items', display_fields=('name', 'price'), query='price<?', params=(300,),
+                                order_field='price', page_size=2, after=token)
+    assert rows == [('Nexus 7', 199.99)]
+    assert token is None
+
+
+def test_query_page_nullable_order_field_without_primary_key():
+
+    db = SqliteInterface(':memory:')
+    db.sql_command("create table readings (label TEXT, value REAL);", modify_db=True)
+    entries = [{'label': f'r{i}', 'value': None if i % 2 else float(i)} for i in range(10)]
+    db.insert_rows(entries, table='readings', field_map={'label': 'label', 'value': 'value'})
+
+    labels = []
+    token = None
+    while True:
+        rows, token = db.query_page(table='readings', display_fields=('label',), order_field='value', page_size=3,
+                                    after=token, output_json=True)
+        labels.extend(row['label'] for row in rows.values())
+        if token is None:
+            break
+
+    assert labels == ['r1', 'r3', 'r5', 'r7', 'r9', 'r0', 'r2', 'r4', 'r6', 'r8']
+
+
+def test_query_page_blob_key():
+
+    db = SqliteInterface(':memory:')
+    db.sql_command("create table files (digest BLOB PRIMARY KEY, size INTEGER);", modify_db=True)
+    db.insert_rows([{'digest': bytes([i, 0, 255]), 'size': i} for i in range(5)], table='files',
+                   field_map={'digest': 'digest', 'size': 'size'})
+
+    sizes = []
+    token = None
+    while True:
+        rows, token = db.query_page(table='files', display_fields=('size',), page_size=2, after=token)
+        sizes.extend(size for size, in rows)
+        if token is None:
+            break
+
+    assert sizes == [0, 1, 2, 3, 4]
@@ -0,0 +1,22 @@
+import pytest
+
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_parallel_query_matches_query(executor):
+
+    db = SqliteInterface('data/shop.db')
+    queries = db.parallel_query(table='items', workers=2, partitions=4, executor=executor)
+
+    assert queries == db.query(table='items')
+
+
+def test_parallel_query_iter_filtered():
+
+    db = SqliteInterface('data/shop.db')
+    rows = db.parallel_query_iter(table='items', display_fields=('name', 'price'), query='category=?',
+                                  params=('Sporting Goods',), workers=3, partitions=6)
+
+    assert sorted(rows) == sorted(db.query(table='items', display_fields=('name', 'price'),
+                                           query='category="Sporting Goods"'))
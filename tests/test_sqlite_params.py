@@ -0,0 +1,33 @@
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+def test_query_params():
+
+    db = SqliteInterface('data/shop.db')
+    queries = db.query(table='items', display_fields=('name', 'price'), query='category=? and price<?',
+                       params=('Sporting Goods', 30))
+
+    assert queries == [('Baseball', 9.99), ('Basketball', 29.99)]
+
+
+def test_statement_cache_hits():
+
+    db = SqliteInterface('data/shop.db')
+    for price in (10, 50, 100):
+        db.query(table='items', display_fields=('name',), query='price<?', params=(price,))
+
+    info = db.statement_cache_info()
+    assert info['misses'] == 1
+    assert info['hits'] == 2
+
+
+def test_update_and_delete_params(shop_db):
+
+    db = SqliteInterface(shop_db)
+    db.update_fields(table='items', update={'price': 5.0, 'category': 'Balls "R" Us'}, query='name=?',
+                     params=('Basketball',))
+    db.delete_rows(table='items', query='category=?', params=('Electronics',))
+
+    assert db.query(table='items', display_fields=('name', 'category', 'price'), query='price<?', params=(10,)) == \
+        [('Baseball', 'Sporting Goods', 9.99), ('Basketball', 'Balls "R" Us', 5.0)]
+    assert len(db.query(table='items')) == 3
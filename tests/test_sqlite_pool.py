@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+def test_pooled_concurrent_reads_and_writes(shop_db):
+
+    db = SqliteInterface(shop_db, pool_size=4)
+    field_map = {"name": "name", "category": "category", "price": "price", "stocked": "stocked"}
+
+    def write(i):
+        db.insert_row(entry={"name": f"item{i}", "category": "Toys", "price": 1.0, "stocked": 1}, table='items',
+                      field_map=field_map)
+
+    def read(i):
+        return len(db.query(table='items', query='category=?', params=('Sporting Goods',)))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        writes = [executor.submit(write, i) for i in range(20)]
+        reads = [executor.submit(read, i) for i in range(50)]
+        assert all(future.result() == 3 for future in reads)
+        for future in writes:
+            future.result()
+
+    assert len(db.query(table='items', query='category="Toys"')) == 20
+    assert len(db._all_readers) <= 4
+    assert db.sql_command("pragma journal_mode;") == [('wal',)]
+    db.close()
+
+
+def test_pooled_transaction_reads_own_writes(shop_db):
+
+    db = SqliteInterface(shop_db, pool_size=2)
+    with db.transaction():
+        db.clear_table(table='items')
+        assert db.query(table='items') == []
+
+    assert db.get_distinct_values(table='items', field='category') == []
+    db.close()
+
+
+def test_pooled_reads_inside_open_stream(shop_db):
+
+    db = SqliteInterface(shop_db, pool_size=1)
+    names = []
+    for (name,) in db.query_iter(table='items', display_fields=('name',), batch_size=1):
+        names.append(name)
+        assert len(db.query(table='items', query='name=?', params=(name,))) == 1
+        assert db.fields['items'][0] == 'name'
+        assert 'items' in db.tables
+        assert len(db.get_distinct_values(table='items', field='name')) == 6
+
+    assert len(names) == 6
+    assert len(db._all_readers) == 1
+    assert not db._overflow_readers
+    db.close()
+
+
+def test_pooled_write_inside_open_stream(shop_db):
+
+    db = SqliteInterface(shop_db, pool_size=1)
+    stream = db.query_iter(table='items', display_fields=('name',), batch_size=1)
+    next(stream)
+    db.insert_row({'name': 'Frisbee', 'category': 'Toys', 'price': 5.0, 'stocked': 1}, table='items',
+                  field_map={'name': 'name', 'category': 'category', 'price': 'price', 'stocked': 'stocked'})
+    stream.close()
+
+    assert len(db.query(table='items')) == 7
+    db.close()
@@ -0,0 +1,48 @@
+import sqlite3
+
+import pytest
+
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+def test_profiles_apply_pragmas(shop_db):
+
+    db = SqliteInterface(shop_db, profile='read_heavy')
+    assert db.sql_command("pragma journal_mode;") == [('wal',)]
+    assert db.sql_command("pragma synchronous;") == [(1,)]
+    assert db.sql_command("pragma cache_size;") == [(-65536,)]
+    assert len(db.query(table='items')) == 6
+    db.close()
+
+    db = SqliteInterface(shop_db, profile={'synchronous': 'off', 'temp_store': 'memory'})
+    assert db.sql_command("pragma synchronous;") == [(0,)]
+    assert db.sql_command("pragma temp_store;") == [(2,)]
+    db.close()
+
+    with pytest.raises(ValueError):
+        SqliteInterface(shop_db, profile='fastest')
+    with pytest.raises(ValueError):
+        SqliteInterface(shop_db, profile={'locking_mode': 'exclusive'})
+
+
+def test_profile_page_size_on_new_database(tmp_path):
+
+    path = str(tmp_path / 'new.db')
+    db = SqliteInterface(path, profile='bulk_load')
+    db.sql_command("create table items (name text primary key, price real);", modify_db=True)
+    db.insert_rows(entries=({"name": f"item{i}", "price": i} for i in range(100)), table='items',
+                   field_map={"name": "name", "price": "price"})
+    db.close()
+
+    connection = sqlite3.connect(path)
+    assert connection.execute("pragma page_size;").fetchone()[0] == 8192
+    connection.close()
+
+
+def test_pooled_profile_keeps_wal(shop_db):
+
+    db = SqliteInterface(shop_db, pool_size=2, profile='bulk_load')
+    assert db.sql_command("pragma journal_mode;") == [('wal',)]
+    with db._read_connection() as connection:
+        assert connection.execute("pragma cache_size;").fetchone()[0] == -262144
+    db.close()
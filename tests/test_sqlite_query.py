@@ -1,3 +1,5 @@
+import pytest
+
 from pydatabase.sqlite_interface import SqliteInterface
 
 def test_query_all():
@@ -45,4 +47,63 @@ def test_query_numerical():
     db = SqliteInterface('data/shop.db')
     queries = db.query(table='items', display_fields=('name', 'price'), query='price<50')
 
-    assert queries == data
\ No newline at end of file
+    assert queries == data
+
+def test_query_iter_matches_query():
+
+    db = SqliteInterface('data/shop.db')
+    streamed = list(db.query_iter(table='items', display_fields=('name', 'price'), query='price<50', batch_size=2))
+
+    assert streamed == db.query(table='items', display_fields=('name', 'price'), query='price<50')
+    assert dict(db.query_iter(table='items', output_json=True)) == db.query(table='items', output_json=True)
+
+
+def test_query_iter_interleaved():
+
+    db = SqliteInterface('data/shop.db')
+    stream = db.query_iter(table='items', display_fields=('name',), batch_size=1)
+    first = next(stream)
+    db.query(table='items', query='price<50')
+
+    assert [first] + list(stream) == db.query(table='items', display_fields=('name',))
+
+
+def test_schema_reloaded_after_ddl(shop_db):
+
+    db = SqliteInterface(shop_db)
+    other = SqliteInterface(shop_db)
+    assert db.fields['items'] == ['name', 'category', 'price', 'stocked']
+    assert db._table_schema('items') is other._table_schema('items')
+
+    other.sql_command("create table users (id INTEGER PRIMARY KEY, name TEXT);", modify_db=True)
+
+    assert db.tables == ['items', 'users']
+    assert db.primary_key['users'] == 'id'
+    assert dict(db.primary_key) == {'items': 'name', 'users': 'id'}
+    assert db.field_info['users']['name'] == {'idx': 1, 'type': 'TEXT', 'not_null': 0}
+
+
+def test_schema_lists_are_copies(shop_db):
+
+    db = SqliteInterface(shop_db)
+    other = SqliteInterface(shop_db)
+    db.tables.append('users')
+    db.fields['items'].sort()
+
+    assert other.tables == ['items']
+    assert other.fields['items'] == ['name', 'category', 'price', 'stocked']
+
+
+def test_schema_dropped_after_rolled_back_ddl(shop_db):
+
+    db = SqliteInterface(shop_db)
+    other = SqliteInterface(shop_db)
+    with pytest.raises(ValueError):
+        with db.transaction():
+            db.sql_command("create table users (id INTEGER PRIMARY KEY, name TEXT);", modify_db=True)
+            assert 'users' in db.tables
+            raise ValueError
+
+    # a different change committed under the same schema version must not pick up the rolled back table
+    other.sql_command("create table orders (id INTEGER PRIMARY KEY);", modify_db=True)
+    assert db.tables == ['items', 'orders']
@@ -0,0 +1,31 @@
+import pytest
+
+from pydatabase.sqlite_interface import SqliteInterface, Row
+
+
+def test_compact_rows_as_dict_and_attributes():
+
+    db = SqliteInterface('data/shop.db')
+    queries = db.query(table='items', output_json=True, compact_rows=True)
+
+    assert queries == db.query(table='items', output_json=True)
+    row = queries['Football']
+    assert isinstance(row, Row)
+    assert row['price'] == row.price == row[2] == 49.99
+    assert dict(row) == {'name': 'Football', 'category': 'Sporting Goods', 'price': 49.99, 'stocked': 1}
+    assert 'category' in row and 'colour' not in row
+    assert row.get('colour', 0) == 0
+    assert tuple(row) == row.values() == ('Football', 'Sporting Goods', 49.99, 1)
+    with pytest.raises(AttributeError):
+        row.colour
+
+
+def test_compact_rows_display_fields_and_iter():
+
+    db = SqliteInterface('data/shop.db')
+    rows = db.query(table='items', display_fields=('name', 'price'), query='price<?', params=(30,), compact_rows=True)
+    assert [(row.name, row.price) for row in rows] == [('Baseball', 9.99), ('Basketball', 29.99)]
+
+    streamed = dict(db.query_iter(table='items', display_fields=('price', 'name'), output_json=True, compact_rows=True))
+    assert streamed['Nexus 7'].price == 199.99
+    assert streamed['Nexus 7'].keys() == ['price', 'name']
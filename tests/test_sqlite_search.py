@@ -0,0 +1,55 @@
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+def test_search_index_ranks_and_stays_in_sync(shop_db):
+
+    db = SqliteInterface(shop_db)
+    assert db.create_search_index(table='items', fields=('name', 'category')) == 'items_fts'
+
+    assert db.search(table='items', text='electronics', display_fields=('name',), limit=None) == \
+        [('iPod Touch',), ('iPhone 5',), ('Nexus 7',)]
+    assert db.search(table='items', text='bask*', display_fields=('name', 'price')) == [('Basketball', 29.99)]
+
+    field_map = {"name": "name", "category": "category", "price": "price", "stocked": "stocked"}
+    db.insert_row(entry={"name": "Soccer ball", "category": "Sporting Goods", "price": 19.99, "stocked": 1},
+                  table='items', field_map=field_map)
+    db.update_fields(table='items', update={"name": "Tennis ball"}, query='name=?', params=('Baseball',))
+    db.delete_rows(table='items', query='name=?', params=('Basketball',))
+
+    queries = db.search(table='items', text='ball', output_json=True)
+    assert set(queries) == {'Soccer ball', 'Tennis ball'}
+    assert queries['Tennis ball']['price'] == 9.99
+    assert db.search(table='items', text='baseball') == []
+
+    db.drop_search_index(table='items')
+    assert 'items_fts' not in db.tables
+    db.insert_row(entry={"name": "Golf ball", "category": "Sporting Goods", "price": 2.0, "stocked": 1},
+                  table='items', field_map=field_map)
+
+
+def test_search_index_ignores_other_fields_and_drops_with_table(shop_db):
+
+    db = SqliteInterface(shop_db)
+    db.create_search_index(table='items', fields=('name',))
+    changes = db.connection.total_changes
+    db.update_rows_by_key(table='items', updates={'Football': {'price': 45.0}})
+    assert db.connection.total_changes - changes == 1
+    assert db.search(table='items', text='football', display_fields=('price',)) == [(45.0,)]
+
+    db.delete_table(table='items')
+    assert 'items_fts' not in db.tables
+    assert db.sql_command("select name from sqlite_master where type='trigger';") == []
+
+
+def test_search_trigram_matches_substrings(shop_db):
+
+    db = SqliteInterface(shop_db)
+    assert db.create_search_index(table='items', fields=('name',)) == 'items_fts'
+    assert db.search(table='items', text='ball') == []
+    db.drop_search_index(table='items')
+
+    db.create_search_index(table='items', fields=('name',), tokenize='trigram')
+    names = {name for name, in db.search(table='items', text='ball', display_fields=('name',), limit=None)}
+    assert names == {name for name, in db.query(table='items', display_fields=('name',), query='name like ?',
+                                                 params=('%ball%',))}
+    assert names == {'Football', 'Baseball', 'Basketball'}
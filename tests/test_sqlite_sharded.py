@@ -0,0 +1,76 @@
+import pytest
+
+from pydatabase.sharded_sqlite_interface import ShardedSqliteInterface
+from pydatabase.sqlite_interface import SqliteInterface
+
+FIELD_MAP = {"name": "name", "category": "category", "price": "price", "stocked": "stocked"}
+
+
+@pytest.fixture
+def sharded_db(tmp_path):
+
+    db = ShardedSqliteInterface([str(tmp_path / f'shard{i}.db') for i in range(4)])
+    db.sql_command("create table items (name text primary key not null, category text not null, price real not null, "
+                   "stocked integer not null);", modify_db=True)
+    yield db
+    db.close()
+
+
+def test_sharded_writes_go_to_owning_shard(sharded_db):
+
+    entries = ({"name": f"item{i}", "category": f"category{i % 3}", "price": float(i), "stocked": i % 2}
+               for i in range(1000))
+    stats = sharded_db.insert_rows(entries=entries, table='items', field_map=FIELD_MAP, batch_size=100)
+    assert stats['rows'] == 1000
+    sharded_db.insert_row(entry={"name": "ball", "category": "toys", "price": 1.0, "stocked": 1}, table='items',
+                          field_map=FIELD_MAP)
+
+    shards = [SqliteInterface(path) for path in sharded_db.db_paths]
+    counts = [len(shard.query(table='items')) for shard in shards]
+    assert sum(counts) == 1001 and all(counts)
+    owner = sharded_db.shard_index('ball')
+    assert [len(shard.query(table='items', query='name=?', params=('ball',))) for shard in shards] == \
+        [1 if i == owner else 0 for i in range(4)]
+
+    sharded_db.upsert_rows(entries=[{"name": "ball", "category": "toys", "price": 2.0, "stocked": 0}],
+                           table='items', field_map=FIELD_MAP)
+    sharded_db.update_rows_by_key(table='items', updates={"item7": {"price": 70.0}})
+    queries = sharded_db.query(table='items', query='name in (?,?)', params=('ball', 'item7'), output_json=True)
+    assert queries == {'ball': {'name': 'ball', 'category': 'toys', 'price': 2.0, 'stocked': 0},
+                       'item7': {'name': 'item7', 'category': 'category1', 'price': 70.0, 'stocked': 1}}
+
+
+def test_sharded_fan_out_reads_and_deletes(sharded_db):
+
+    entries = [{"name": f"item{i}", "category": f"category{i % 3}", "price": float(i), "stocked": i % 2}
+               for i in range(100)]
+    sharded_db.insert_rows(entries=entries, table='items', field_map=FIELD_MAP)
+
+    assert sorted(sharded_db.get_distinct_values(table='items', field='category')) == \
+        [('category0',), ('category1',), ('category2',)]
+    assert sorted(sharded_db.query(table='items', display_fields=('name',), query='price<?', params=(3,))) == \
+        [('item0',), ('item1',), ('item2',)]
+    assert len(list(sharded_db.query_iter(table='items', batch_size=7))) == 100
+    assert sorted(sharded_db.query(table='items', display_fields=('price',), output='columns')['price']) == \
+        [float(i) for i in range(100)]
+
+    sharded_db.delete_rows(table='items', query='stocked=?', params=(0,))
+    assert len(sharded_db.query(table='items')) == 50
+    assert sharded_db.fields['items'] == ['name', 'category', 'price', 'stocked']
+
+
+
+def test_sharded_keys_follow_primary_key_type(sharded_db):
+
+    sharded_db.sql_command("create table orders (id integer primary key, total real);", modify_db=True)
+    field_map = {"id": "id", "total": "total"}
+    sharded_db.insert_rows(entries=[{"id": str(i), "total": 1.0} for i in range(20)], table='orders',
+                           field_map=field_map)
+    sharded_db.upsert_rows(entries=[{"id": float(i), "total": 2.0} for i in range(10)], table='orders',
+                           field_map=field_map)
+    sharded_db.update_rows_by_key(table='orders', updates={i: {"total": 3.0} for i in range(10, 20)})
+
+    totals = sharded_db.query(table='orders', output_json=True)
+    assert len(totals) == 20
+    assert [totals[i]['total'] for i in range(20)] == [2.0] * 10 + [3.0] * 10
+    assert all(sharded_db.shard_index(str(i), table='orders') == sharded_db.shard_index(i) for i in range(20))
@@ -0,0 +1,57 @@
+import pytest
+
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+def test_transaction_commits_on_exit(shop_db):
+
+    db = SqliteInterface(shop_db)
+    other = SqliteInterface(shop_db)
+    with db.transaction():
+        db.update_fields(table='items', update={'price': 1.0}, query='name=?', params=('Football',))
+        db.delete_rows(table='items', query='category=?', params=('Electronics',))
+        # not yet visible to other connections
+        assert len(other.query(table='items')) == 6
+
+    assert other.query(table='items', display_fields=('price',), query='name="Football"') == [(1.0,)]
+    assert len(other.query(table='items')) == 3
+
+
+def test_transaction_rollback_on_exception(shop_db):
+
+    db = SqliteInterface(shop_db)
+    with pytest.raises(ValueError):
+        with db.transaction():
+            db.clear_table(table='items')
+            with db.transaction():
+                db.update_fields(table='items', update={'price': 1.0}, query='price<50')
+            raise ValueError
+
+    assert len(db.query(table='items')) == 6
+
+
+def test_autocommit_every(shop_db):
+
+    db = SqliteInterface(shop_db)
+    other = SqliteInterface(shop_db)
+    with db.autocommit_every(2):
+        db.delete_rows(table='items', query='name=?', params=('Football',))
+        assert len(other.query(table='items')) == 6
+        db.delete_rows(table='items', query='name=?', params=('Baseball',))
+        assert len(other.query(table='items')) == 4
+        db.delete_rows(table='items', query='name=?', params=('Basketball',))
+
+    assert len(other.query(table='items')) == 3
+
+
+def test_transaction_rolls_back_ddl(shop_db):
+
+    db = SqliteInterface(shop_db)
+    with pytest.raises(ValueError):
+        with db.transaction():
+            db.create_index(table='items', fields=('category',))
+            db.delete_table(table='items')
+            raise ValueError
+
+    assert len(db.query(table='items')) == 6
+    assert list(db.list_indexes(table='items')) == ['sqlite_autoindex_items_1']
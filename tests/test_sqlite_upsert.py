@@ -0,0 +1,58 @@
+import pytest
+
+from pydatabase.sqlite_interface import SqliteInterface
+
+
+def test_upsert_rows(shop_db):
+
+    field_map = {"name": "name", "category": "category", "price": "cost", "stocked": "stocked"}
+    feed = [{"name": "Football", "category": "Sporting Goods", "cost": 45.0, "stocked": 0},
+            {"name": "Frisbee", "category": "Toys", "cost": 5.0, "stocked": 1}]
+
+    db = SqliteInterface(shop_db)
+    stats = db.upsert_rows(entries=iter(feed), table='items', field_map=field_map, batch_size=1)
+
+    assert stats['rows'] == 2
+    assert stats['changed'] == 2
+    assert db.query(table='items', query='name in ("Football","Frisbee")') == \
+        [('Football', 'Sporting Goods', 45.0, 0), ('Frisbee', 'Toys', 5.0, 1)]
+    assert len(db.query(table='items')) == 7
+
+
+def test_update_rows_by_key(shop_db):
+
+    db = SqliteInterface(shop_db)
+    stats = db.update_rows_by_key(table='items', updates={'Football': {'price': 45.0},
+                                                          'Basketball': {'price': 25.0, 'stocked': 1},
+                                                          'Missing': {'price': 1.0}}, batch_size=2)
+
+    assert stats['rows'] == 3
+    assert stats['changed'] == 2
+    assert db.query(table='items', display_fields=('name', 'price', 'stocked'), query='price<50') == \
+        [('Football', 45.0, 1), ('Baseball', 9.99, 1), ('Basketball', 25.0, 1)]
+
+
+def test_update_rows_by_key_skips_empty_updates(shop_db):
+
+    db = SqliteInterface(shop_db)
+    stats = db.update_rows_by_key(table='items', updates={'Football': {}, 'Baseball': {'price': 8.0}})
+
+    assert stats['changed'] == 1
+    assert db.query(table='items', display_fields=('name', 'price'), query='name in ("Football","Baseball")') == \
+        [('Baseball', 8.0), ('Football', 49.99)]
+
+
+def test_upsert_without_primary_key_needs_key_field():
+
+    db = SqliteInterface(':memory:')
+    db.sql_command("create table readings (label TEXT UNIQUE, value REAL);", modify_db=True)
+    field_map = {'label': 'label', 'value': 'value'}
+
+    with pytest.raises(ValueError, match='no primary key'):
+        db.upsert_rows([{'label': 'a', 'value': 1.0}], table='readings', field_map=field_map)
+    with pytest.raises(ValueError, match='no primary key'):
+        db.update_rows_by_key(table='readings', updates={'a': {'value': 2.0}})
+
+    db.upsert_rows([{'label': 'a', 'value': 1.0}, {'label': 'a', 'value': 3.0}], table='readings',
+                   field_map=field_map, key_field='label')
+    assert db.query(table='readings') == [('a', 3.0)]